@@ -0,0 +1,285 @@
+import cProfile
+import gzip
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from . import profiling, routers
+from .querybudget import QueryBudgetExceeded, QueryRecorder, check
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+logger = logging.getLogger(__name__)
+
+
+def _pin_key(request):
+    auth = request.META.get('HTTP_AUTHORIZATION')
+    if not auth:
+        return None
+    return 'db_pin_' + hashlib.sha256(auth.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve safe requests to views with `read_from_replica = True` from a replica,
+    as well as requests with a method listed in the view's `read_only_methods`.
+
+    After a write the client (identified by its Authorization header) is
+    pinned to the primary for REPLICA_PIN_SECONDS so it reads its own writes.
+    Requests served per database are counted in the cache under
+    `db_route_primary` and `db_route_replica`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            aliases = routers.end_request()
+        if getattr(request, '_pin_to_primary', False):
+            # Pinned once the write is done, so a write slower than
+            # REPLICA_PIN_SECONDS still gets the whole window.
+            cache.set(_pin_key(request), 1, settings.REPLICA_PIN_SECONDS)
+        if routers.replica_aliases():
+            self.record(aliases)
+        return response
+
+    def record(self, aliases):
+        if not aliases:
+            return
+        replica = any(alias != 'default' for alias in aliases)
+        key = 'db_route_replica' if replica else 'db_route_primary'
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not routers.replica_aliases():
+            return None
+
+        pin_key = _pin_key(request)
+        view_class = getattr(view_func, 'view_class', None)
+        read_only_methods = getattr(view_class, 'read_only_methods', ())
+        if request.method not in SAFE_METHODS and request.method not in read_only_methods:
+            request._pin_to_primary = pin_key is not None
+            return None
+
+        if not getattr(view_class, 'read_from_replica', False):
+            return None
+        if pin_key and cache.get(pin_key):
+            return None
+        routers.use_replica()
+        return None
+
+
+def _compress_gzip(content):
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def _compress_brotli(content):
+    # Low qualities are several times faster and still beat gzip on JSON.
+    return brotli.compress(content, quality=4)
+
+
+def _compress_zstd(content):
+    return zstandard.ZstdCompressor(level=3).compress(content)
+
+
+def _available_encoders():
+    """
+    Supported content codings, most preferred first.
+    """
+    encoders = []
+    if zstandard is not None:
+        encoders.append(('zstd', _compress_zstd))
+    if brotli is not None:
+        encoders.append(('br', _compress_brotli))
+    encoders.append(('gzip', _compress_gzip))
+    return encoders
+
+
+ENCODERS = _available_encoders()
+
+
+def _accepted_encodings(header):
+    """
+    Map each coding of an Accept-Encoding header to its q value.
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+    return accepted
+
+
+def choose_encoding(header):
+    """
+    The preferred supported coding the client accepts, or None.
+    """
+    accepted = _accepted_encodings(header)
+    best = None
+    for coding, compress in ENCODERS:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[2]):
+            best = (coding, compress, quality)
+    return best[:2] if best else (None, None)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with zstd, brotli or gzip, as negotiated with the
+    Accept-Encoding header.
+
+    Responses smaller than COMPRESSION_MIN_SIZE bytes are sent as they are,
+    as are streaming responses and responses already encoded by the view.
+    brotli and zstd are only offered when their packages are installed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        coding, compress = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+        compressed = compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        # The compressed body is not byte-for-byte the same representation.
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Check the queries of every request against the view's `query_budget`
+    and for N+1 patterns, see `querybudget`. QUERY_BUDGET_MODE `warn` logs
+    violations as JSON, `raise` fails the request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == 'off':
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        view, budgets = getattr(request, '_query_budget', (None, {}))
+        budget = budgets.get(request.method)
+        if budget is not None:
+            budget += getattr(request, '_query_allowance', 0)
+        violations = check(recorder.queries, budget)
+        if violations:
+            report = json.dumps({
+                'event': 'query_budget_exceeded',
+                'method': request.method,
+                'path': request.path,
+                'view': view,
+                'queries': len(recorder.queries),
+                'violations': violations,
+            })
+            if mode == 'raise':
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if view_class is not None:
+            request._query_budget = (view_class.__name__, getattr(view_class, 'query_budget', {}))
+        return None
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests into PROFILE_DIR, see `profiling`:
+
+    - with cProfile, a PROFILE_SAMPLE_RATE fraction of requests and requests
+      with an `X-Profile-Token` header made by `manage.py profile_token`,
+      valid for PROFILE_TOKEN_MAX_AGE seconds;
+    - by sampling their stacks, requests running longer than
+      PROFILE_SLOW_SECONDS.
+
+    Everything is off by default, list the profiles with
+    `manage.py list_profiles`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = self.profile_reason(request)
+        if reason:
+            return self.profile(request, reason)
+        if settings.PROFILE_SLOW_SECONDS:
+            return self.sample(request)
+        return self.get_response(request)
+
+    def profile_reason(self, request):
+        token = request.META.get('HTTP_X_PROFILE_TOKEN')
+        if token and settings.PROFILE_TOKEN_MAX_AGE and profiling.valid_token(token):
+            return 'token'
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return 'sample'
+        return None
+
+    def profile(self, request, reason):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        profiling.save(request, response, time.perf_counter() - started, reason, profiler=profiler)
+        return response
+
+    def sample(self, request):
+        started = time.perf_counter()
+        with profiling.sampler.watch() as stacks:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        if duration >= settings.PROFILE_SLOW_SECONDS and stacks:
+            profiling.save(request, response, duration, 'slow', stacks=stacks)
+        return response
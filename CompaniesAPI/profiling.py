@@ -0,0 +1,186 @@
+"""
+Request profiles for `middleware.ProfilingMiddleware`.
+
+Two kinds of profile are written to PROFILE_DIR, each next to a `.json`
+file with the request's metadata:
+
+- `.prof`: cProfile stats of a whole request, for sampled requests and
+  requests carrying a valid signed `X-Profile-Token` header. Open them with
+  `pstats`, snakeviz, etc.
+- `.collapsed`: stacks sampled every PROFILE_SAMPLE_INTERVAL seconds once a
+  request has run for PROFILE_SLOW_SECONDS, one `frame;frame;frame count`
+  line per stack, as read by flamegraph.pl and speedscope.
+
+Requests that aren't profiled from the start only register their thread
+with the sampler, so they cost next to nothing until they get slow.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+TOKEN_SALT = 'CompaniesAPI.profiling'
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """
+    Samples the stacks of the threads being watched, once they have run
+    for PROFILE_SLOW_SECONDS, from a daemon thread.
+
+    The thread waits on `wake` until the oldest watched request gets slow,
+    or indefinitely while nothing is watched, so it only wakes every
+    PROFILE_SAMPLE_INTERVAL while there is a slow request to sample.
+    """
+
+    def __init__(self):
+        self.watched = {}
+        self.pid = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def _ensure_thread(self):
+        # Threads don't survive a fork, start one per process.
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.watched = {}
+                self.wake = threading.Event()
+                threading.Thread(target=self._run, args=(self.wake,), name='profile-sampler', daemon=True).start()
+                self.pid = os.getpid()
+
+    def _run(self, wake):
+        while True:
+            # Cleared before looking at `watched`, so a request watched in
+            # between still wakes the wait below.
+            wake.clear()
+            started = [started for started, stacks in list(self.watched.values())]
+            if not started:
+                wake.wait()
+                continue
+            delay = min(started) + settings.PROFILE_SLOW_SECONDS - time.perf_counter()
+            if delay > 0:
+                wake.wait(delay)
+                continue
+
+            time.sleep(settings.PROFILE_SAMPLE_INTERVAL)
+            now = time.perf_counter()
+            frames = None
+            for thread_id, (started, stacks) in list(self.watched.items()):
+                if now - started < settings.PROFILE_SLOW_SECONDS:
+                    continue
+                if frames is None:
+                    frames = sys._current_frames()
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[_collapse(frame)] += 1
+
+    @contextmanager
+    def watch(self):
+        """
+        Yield the Counter the stacks of the current thread are sampled into.
+        """
+        self._ensure_thread()
+        thread_id = threading.get_ident()
+        stacks = Counter()
+        self.watched[thread_id] = (time.perf_counter(), stacks)
+        self.wake.set()
+        try:
+            yield stacks
+        finally:
+            self.watched.pop(thread_id, None)
+
+
+sampler = StackSampler()
+
+
+def _slug(path):
+    return re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-')[:60] or 'root'
+
+
+def save(request, response, duration, reason, profiler=None, stacks=None):
+    """
+    Write a profile and its metadata, returning the path without extension.
+    """
+    directory = Path(settings.PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    base = directory / f'{now:%Y%m%dT%H%M%S.%f}-{os.getpid()}-{request.method}-{_slug(request.path)}'
+    if profiler is not None:
+        kind = 'cprofile'
+        profiler.dump_stats(f'{base}.prof')
+    else:
+        kind = 'collapsed'
+        with open(f'{base}.collapsed', 'w') as collapsed:
+            collapsed.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+    match = request.resolver_match
+    metadata = {
+        'kind': kind,
+        'reason': reason,
+        'method': request.method,
+        'path': request.path,
+        'query_string': request.META.get('QUERY_STRING', ''),
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'duration': round(duration, 6),
+        'pid': os.getpid(),
+        'created_at': now.isoformat(),
+    }
+    with open(f'{base}.json', 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
+    _prune(directory)
+    return base
+
+
+def _prune(directory):
+    profiles = sorted(directory.glob('*.json'))
+    for stale in profiles[:max(len(profiles) - settings.PROFILE_KEEP, 0)]:
+        for path in directory.glob(f'{stale.stem}.*'):
+            path.unlink(missing_ok=True)
+
+
+def list_profiles():
+    """
+    Metadata of the stored profiles, newest first, with the `file` of the
+    profile itself.
+    """
+    directory = Path(settings.PROFILE_DIR)
+    profiles = []
+    for metadata_path in sorted(directory.glob('*.json'), reverse=True):
+        with open(metadata_path) as metadata_file:
+            metadata = json.load(metadata_file)
+        extension = '.prof' if metadata['kind'] == 'cprofile' else '.collapsed'
+        metadata['file'] = str(metadata_path.with_suffix(extension))
+        metadata['name'] = metadata_path.stem
+        profiles.append(metadata)
+    return profiles
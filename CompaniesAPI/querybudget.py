@@ -0,0 +1,118 @@
+"""
+Query budgets and N+1 detection.
+
+Every query run inside `QueryRecorder.record()` is fingerprinted: literals
+and placeholders are replaced so queries of the same shape share one
+fingerprint. `check()` then reports
+
+- `budget`: more queries than the view's `query_budget` for the method,
+  e.g. `query_budget = {'GET': 3, 'POST': 5}`, plus what the view allowed
+  the request with `allow_queries()` for optional work.
+- `n_plus_one`: a fingerprint repeated QUERY_REPEAT_THRESHOLD times or more,
+  with the serializer fields that ran it.
+
+`middleware.QueryBudgetMiddleware` checks every request when
+QUERY_BUDGET_MODE is `warn` (logs a JSON warning, for staging) or `raise`
+(fails the request, used by the test runner). Tests can also check a block
+with `assert_query_budget()`.
+"""
+import json
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import Field
+
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+# Transaction control repeats by design.
+_IGNORED = re.compile(r'^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def allow_queries(request, count):
+    """
+    Let `request` (a Django or DRF request) run `count` queries more than
+    its view's budget, for work only some requests do.
+    """
+    request = getattr(request, '_request', request)
+    request._query_allowance = getattr(request, '_query_allowance', 0) + count
+
+
+def fingerprint(sql):
+    for pattern, replacement in _NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _serializer_field():
+    """
+    `Serializer.field` of the innermost serializer field being rendered or
+    validated by the caller, or None.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        field = frame.f_locals.get('self')
+        # type() rather than isinstance(), which would evaluate lazy objects.
+        if issubclass(type(field), Field) and field.field_name:
+            return f'{type(field.parent).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRecorder:
+    def __init__(self):
+        # (fingerprint, serializer field)
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _IGNORED.match(sql):
+            self.queries.append((fingerprint(sql), _serializer_field()))
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+def check(queries, budget=None, threshold=None):
+    """
+    Return the violations of `queries` recorded by a QueryRecorder.
+    """
+    if threshold is None:
+        threshold = settings.QUERY_REPEAT_THRESHOLD
+    violations = []
+    if budget is not None and len(queries) > budget:
+        violations.append({'type': 'budget', 'queries': len(queries), 'budget': budget})
+    for sql, count in Counter(sql for sql, _ in queries).items():
+        if count >= threshold:
+            origins = sorted({origin for query, origin in queries if query == sql and origin})
+            violations.append({'type': 'n_plus_one', 'sql': sql, 'count': count, 'origins': origins})
+    return violations
+
+
+@contextmanager
+def assert_query_budget(budget=None, threshold=None):
+    """
+    Fail if the block runs more than `budget` queries or repeats a query.
+    """
+    recorder = QueryRecorder()
+    with recorder.record():
+        yield recorder
+    violations = check(recorder.queries, budget, threshold)
+    if violations:
+        raise QueryBudgetExceeded(json.dumps(violations, indent=2))
@@ -0,0 +1,58 @@
+"""
+Database routing for read replicas.
+
+Reads go to a replica only while a request marked by ReplicaRoutingMiddleware
+is being served, so management commands, migrations and background code
+always talk to the primary.
+"""
+import random
+
+from asgiref.local import Local
+from django.conf import settings
+
+_state = Local()
+
+
+def start_request():
+    _state.replica = None
+    _state.used = set()
+
+
+def end_request():
+    used = getattr(_state, 'used', set())
+    _state.replica = None
+    _state.used = None
+    return used
+
+
+def use_replica():
+    # One replica per request keeps all of its reads on the same snapshot.
+    replicas = replica_aliases()
+    if replicas:
+        _state.replica = random.choice(replicas)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    """
+    Send reads to the request's replica and everything else to `default`.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_state, 'replica', None) or 'default'
+        if getattr(_state, 'used', None) is not None:
+            _state.used.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,102 @@
+"""
+Precomputed OpenAPI schema.
+
+The schema is generated by `manage.py generate_openapi_schema` into
+OPENAPI_SCHEMA_FILE and served from memory, instead of introspecting every
+view and serializer on each request.
+"""
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import OpenAPIRenderer
+from rest_framework.views import APIView
+
+from .middleware import choose_encoding
+
+SCHEMA_INFO = {
+    'title': 'Companies API',
+    'description': 'Companies API.',
+    'version': '1.0.0',
+}
+
+_cache = {}
+
+
+def generate_schema():
+    """
+    Render the schema of every endpoint, as `get_schema_view` would for a
+    user allowed to see all of them.
+    """
+    # Imported here since workers only serve the pregenerated file.
+    from rest_framework.schemas.openapi import SchemaGenerator
+
+    schema = SchemaGenerator(**SCHEMA_INFO).get_schema(request=None, public=True)
+    return OpenAPIRenderer().render(schema, renderer_context={})
+
+
+def load_schema():
+    """
+    Return the schema body and its ETag, read once per process.
+    """
+    if 'body' not in _cache:
+        try:
+            with open(settings.OPENAPI_SCHEMA_FILE, 'rb') as schema_file:
+                body = schema_file.read()
+        except FileNotFoundError:
+            body = generate_schema()
+        _cache['etag'] = '"%s"' % hashlib.sha256(body).hexdigest()
+        _cache['body'] = body
+    return _cache['body'], _cache['etag']
+
+
+def coding_etag(etag, coding):
+    """
+    The ETag of the schema sent with `coding`, a different representation
+    of it.
+    """
+    return etag if coding is None else f'{etag[:-1]}-{coding}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an If-None-Match header matches `etag`, compared weakly as
+    RFC 9110 requires for it.
+    """
+    etags = parse_etags(if_none_match)
+    if '*' in etags:
+        return True
+    return etag in {tag[2:] if tag.startswith('W/') else tag for tag in etags}
+
+
+def compressed_schema(coding, compress):
+    """
+    Return the schema body compressed with `coding`, once per process.
+    """
+    if coding not in _cache:
+        _cache[coding] = compress(load_schema()[0])
+    return _cache[coding]
+
+
+class StaticSchemaView(APIView):
+    authentication_classes = [SessionAuthentication, TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        body, etag = load_schema()
+        coding, compress = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        etag = coding_etag(etag, coding)
+        if etag_matches(request.META.get('HTTP_IF_NONE_MATCH', ''), etag):
+            response = HttpResponseNotModified()
+        elif coding is not None:
+            response = HttpResponse(compressed_schema(coding, compress), content_type=OpenAPIRenderer.media_type)
+            response['Content-Encoding'] = coding
+        else:
+            response = HttpResponse(body, content_type=OpenAPIRenderer.media_type)
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
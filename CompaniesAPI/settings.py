@@ -46,13 +46,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "CompaniesAPI.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "CompaniesAPI.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "CompaniesAPI.middleware.ReplicaRoutingMiddleware",
+    "CompaniesAPI.middleware.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "CompaniesAPI.urls"
@@ -76,8 +80,53 @@ TEMPLATES = [
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [],
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_THROTTLE_RATES': {
+        'list_burst': os.environ.get("THROTTLE_LIST_BURST", "30/min"),
+        'list_sustained': os.environ.get("THROTTLE_LIST_SUSTAINED", "500/hour"),
+        'detail_burst': os.environ.get("THROTTLE_DETAIL_BURST", "120/min"),
+        'detail_sustained': os.environ.get("THROTTLE_DETAIL_SUSTAINED", "5000/hour"),
+    },
 }
 
+# Seconds a worker may go without reporting progress on a job before the job
+# is claimed again, at most JOB_MAX_ATTEMPTS runs in total.
+JOB_LEASE_SECONDS = int(os.environ.get("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+# Responses smaller than this many bytes are not compressed.
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+
+# Seconds a process may serve banks from its in-memory copy before checking
+# whether another process changed them.
+BANK_CACHE_CHECK_SECONDS = float(os.environ.get("BANK_CACHE_CHECK_SECONDS", 1))
+
+# Checks each request's queries against the view's `query_budget` and for
+# repeated queries (N+1): "off", "warn" (log, for staging) or "raise" (tests).
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "off")
+# A query shape run this many times in one request is reported as N+1.
+QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", 5))
+
+# Seconds the response of a request with an Idempotency-Key is replayed.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+# Request profiling, see CompaniesAPI/profiling.py. Profiles are written to
+# PROFILE_DIR, the oldest removed beyond PROFILE_KEEP.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", BASE_DIR / "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 500))
+# Fraction of requests profiled with cProfile.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+# Seconds a `manage.py profile_token` token is accepted, 0 ignores tokens.
+PROFILE_TOKEN_MAX_AGE = int(os.environ.get("PROFILE_TOKEN_MAX_AGE", 0))
+# Requests running longer than this get their stacks sampled every
+# PROFILE_SAMPLE_INTERVAL seconds, 0 disables it.
+PROFILE_SLOW_SECONDS = float(os.environ.get("PROFILE_SLOW_SECONDS", 0))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+
+TEST_RUNNER = "CompaniesAPI.test_runner.TestRunner"
+
+# Generated by `python manage.py generate_openapi_schema`.
+OPENAPI_SCHEMA_FILE = BASE_DIR / "CompaniesAPI" / "openapi.yaml"
+
 WSGI_APPLICATION = "CompaniesAPI.wsgi.application"
 
 
@@ -95,6 +144,43 @@ DATABASES = {
     }
 }
 
+# Read replicas, e.g. SQL_REPLICA_HOSTS=replica1,replica2. Each replica uses the
+# primary's credentials. Safe requests to the API views read from a replica.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get("SQL_REPLICA_HOSTS", "").split(","))):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dict(DATABASES["default"], HOST=host.strip(), TEST={"MIRROR": "default"})
+    DATABASE_REPLICAS.append(alias)
+
+# Number of hash partitions by company_id of the bank account table, 0 to
+# leave it unpartitioned. Applied by the 0010 migration or later with
+# `python manage.py partition_bank_accounts`. PostgreSQL only.
+BANK_ACCOUNT_PARTITIONS = int(os.environ.get("BANK_ACCOUNT_PARTITIONS", 0))
+
+DATABASE_ROUTERS = ["CompaniesAPI.routers.ReplicaRouter"]
+
+# Seconds a client reads from the primary after a write (read-your-writes).
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# Throttle counters live here, so every worker must share the same backend.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -0,0 +1,52 @@
+"""
+Settings for API-only workers.
+
+Serves token authenticated JSON traffic only: the admin, sessions, messages,
+CSRF, Swagger and the browsable API are left out so workers boot faster.
+Select it with DJANGO_SETTINGS_MODULE=CompaniesAPI.settings_api.
+"""
+import sys
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+# Django REST framework imports its optional coreapi and coreschema packages
+# at startup when they are installed, which only rest_framework_swagger
+# (left out below) uses. coreapi alone takes about a third of a second to
+# import, see `manage.py bench_startup`. Marking them missing makes DRF run
+# without them, as if they weren't installed.
+sys.modules.setdefault("coreapi", None)
+sys.modules.setdefault("coreschema", None)
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in (
+        "django.contrib.admin",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "django.contrib.staticfiles",
+        "rest_framework_swagger",
+    )
+]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+        "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    )
+]
+
+ROOT_URLCONF = "CompaniesAPI.urls_api"
+
+TEMPLATES = []
+
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,
+    DEFAULT_RENDERER_CLASSES=["rest_framework.renderers.JSONRenderer"],
+    DEFAULT_PARSER_CLASSES=["rest_framework.parsers.JSONParser"],
+    DEFAULT_AUTHENTICATION_CLASSES=["rest_framework.authentication.TokenAuthentication"],
+)
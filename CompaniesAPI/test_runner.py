@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Leaves out the tests tagged `perf` unless they are asked for with
+    `--tag perf`, since they seed large datasets.
+
+    Requests exceeding their view's query budget or repeating a query fail
+    the test, see CompaniesAPI.querybudget.
+    """
+
+    def __init__(self, *args, tags=None, exclude_tags=None, **kwargs):
+        if not tags or 'perf' not in tags:
+            exclude_tags = [*(exclude_tags or []), 'perf']
+        super().__init__(*args, tags=tags, exclude_tags=exclude_tags, **kwargs)
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_MODE = 'raise'
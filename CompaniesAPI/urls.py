@@ -16,18 +16,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
-from rest_framework.schemas import get_schema_view
 from rest_framework.authtoken import views
+from .schema import StaticSchemaView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('api/v1/', include('companies.urls')),
     path('api-token-auth/', views.obtain_auth_token),
-    path('openapi', get_schema_view(
-        title="Companies API",
-        description="Companies API.",
-        version="1.0.0"
-    ), name='openapi-schema'),
+    path('openapi', StaticSchemaView.as_view(), name='openapi-schema'),
     path('docs/', TemplateView.as_view(
         template_name='swagger-ui.html',
         extra_context={'schema_url': 'openapi-schema'}
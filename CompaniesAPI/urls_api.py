@@ -0,0 +1,10 @@
+"""CompaniesAPI URL Configuration for API-only workers (see settings_api)."""
+from django.urls import path, include
+from rest_framework.authtoken import views
+from .schema import StaticSchemaView
+
+urlpatterns = [
+    path('api/v1/', include('companies.urls')),
+    path('api-token-auth/', views.obtain_auth_token),
+    path('openapi', StaticSchemaView.as_view(), name='openapi-schema'),
+]
@@ -1,3 +1,93 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 
-# Register your models here.
+from .changes import record, record_deletions
+from .models import Company, Bank, BankAccount, Change, Job
+from .phones import to_e164
+
+# Below this many rows an exact COUNT(*) is cheap enough.
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator using the Postgres planner's row estimate for unfiltered lists,
+    so changelists of huge tables don't run COUNT(*).
+
+    Partitioned tables (see `partitioning`) have no estimate of their own,
+    autovacuum only analyzes their partitions, so theirs are summed.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN parent.relkind = 'p' THEN ("
+                    "  SELECT coalesce(sum(greatest(child.reltuples, 0)), 0) FROM pg_inherits"
+                    "  JOIN pg_class child ON child.oid = pg_inherits.inhrelid"
+                    "  WHERE pg_inherits.inhparent = parent.oid"
+                    ") ELSE parent.reltuples END::bigint "
+                    "FROM pg_class parent WHERE parent.oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Don't count the whole table again when a filter is applied.
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(Bank)
+class BankAdmin(LargeTableAdmin):
+    list_display = ('id', 'code', 'name')
+    search_fields = ('=code',)
+
+
+@admin.register(Company)
+class CompanyAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'phone', 'city', 'country', 'created_at')
+    search_fields = ('=phone_e164',)
+    search_help_text = 'Search by phone number in any format.'
+    readonly_fields = ('phone_e164', 'created_at')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Match the phone through the E.164 index whatever the input format.
+        return super().get_search_results(request, queryset, to_e164(search_term) or search_term)
+
+
+@admin.register(BankAccount)
+class BankAccountAdmin(LargeTableAdmin):
+    list_display = ('id', 'account_number', 'agency', 'bank', 'company')
+    list_select_related = ('bank', 'company')
+    list_filter = ('bank',)
+    raw_id_fields = ('bank', 'company')
+    search_fields = ('=account_number',)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            record(obj, Change.DELETED)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            record_deletions(queryset)
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'total', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    raw_id_fields = ('created_by',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CompaniesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "companies"
+
+    def ready(self):
+        # Register the change log and bank cache receivers, the job handlers
+        # and lookups.
+        from . import banks, changes, deletion, lookups  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Process-local cache of the Bank table.
+
+Banks are few and rarely change, so each process keeps all of them in
+memory, by id and by code, loaded on first use. Saving or deleting a bank
+stores a new version in the shared cache once committed, and processes
+compare their version at most every BANK_CACHE_CHECK_SECONDS, reloading
+when it changed. A process-local cache (no REDIS_URL) can't tell processes
+about changes, so with one the banks are reloaded every
+BANK_CACHE_CHECK_SECONDS instead.
+
+A bank missing from memory is looked up in the database before being
+reported missing, in case it was created since the last reload.
+
+Banks are always read from the primary, even during requests served from a
+replica. Banks loaded from a lagging replica would be kept under the new
+version until the next bank write.
+
+The cached Bank instances are shared, don't modify them.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Bank
+
+VERSION_KEY = 'bank_cache_version'
+
+# Cache backends that aren't shared between processes.
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# (version, banks by id, banks by code), replaced as a whole.
+_banks = None
+_checked_at = 0.0
+
+
+def _new_version():
+    return uuid.uuid4().hex
+
+
+def _load():
+    global _banks, _checked_at
+    now = time.monotonic()
+    if _banks is not None and now - _checked_at < settings.BANK_CACHE_CHECK_SECONDS:
+        return _banks
+    if settings.CACHES['default']['BACKEND'] in LOCAL_BACKENDS:
+        version = None
+    else:
+        # A missing version (evicted, flushed) makes every process reload.
+        version = cache.get_or_set(VERSION_KEY, _new_version, None)
+    if _banks is None or version is None or _banks[0] != version:
+        # Read after the version, so a change committed meanwhile reloads again.
+        by_id, by_code = {}, {}
+        for bank in Bank.objects.using(DEFAULT_DB_ALIAS).order_by('pk'):
+            by_id[bank.pk] = bank
+            by_code.setdefault(bank.code, bank)
+        _banks = (version, by_id, by_code)
+    _checked_at = now
+    return _banks
+
+
+def get(pk):
+    bank = _load()[1].get(pk)
+    if bank is None and Bank.objects.using(DEFAULT_DB_ALIAS).filter(pk=pk).exists():
+        reset()
+        bank = _load()[1].get(pk)
+    return bank
+
+
+def get_by_code(code):
+    """
+    The bank with `code`, the oldest one if several share it.
+    """
+    return _load()[2].get(code)
+
+
+def reset():
+    """
+    Reload this process's banks on next use.
+    """
+    global _banks
+    _banks = None
+
+
+@receiver(post_save, sender=Bank)
+@receiver(post_delete, sender=Bank)
+def invalidate(sender, **kwargs):
+    reset()
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, _new_version(), None))
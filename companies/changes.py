@@ -0,0 +1,101 @@
+"""
+Populates the Change log read by the change feed.
+
+Saves are recorded by post_save receivers. BankAccount deletions are
+recorded with a single INSERT ... SELECT by whoever deletes them (the
+Company and Bank pre_delete receivers for cascades), since a delete
+receiver on BankAccount would make Django load every account before
+deleting it.
+
+On PostgreSQL every transaction that writes changes gets a number from a
+sequence on its first change, stored as the changes' `xid`, and holds an
+advisory lock on that number until it ends (see migration 0014).
+`feed_horizon` reads the lowest number still locked, below which no change
+can appear anymore. Unlike transaction ids, which are shared by the whole
+server, only transactions that write changes hold the feed back.
+"""
+from django.db import connections
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Company, Bank, BankAccount, Change
+from .serializers import CompanySerializer, BankSerializer, BankAccountSerializer
+
+
+class CompanyChangeSerializer(CompanySerializer):
+    # Account membership is in the bank_account changes.
+    class Meta(CompanySerializer.Meta):
+        fields = None
+        exclude = ('bank_accounts',)
+
+
+MODELS = {
+    Company: ('company', CompanyChangeSerializer),
+    Bank: ('bank', BankSerializer),
+    BankAccount: ('bank_account', BankAccountSerializer),
+}
+
+
+def record(instance, action):
+    name, serializer_class = MODELS[type(instance)]
+    data = serializer_class(instance).data if action != Change.DELETED else None
+    return Change.objects.create(model=name, object_id=instance.pk, action=action, data=data)
+
+
+def record_deletions(queryset):
+    """
+    Record tombstones for every row of `queryset` without loading them.
+    """
+    name = MODELS[queryset.model][0]
+    connection = connections[queryset.db]
+    ids_sql, ids_params = queryset.order_by().values('pk').query.sql_with_params()
+    table = connection.ops.quote_name(Change._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (model, object_id, action, created_at, xid) '
+            f'SELECT %s, ids.id, %s, %s, 0 FROM ({ids_sql}) ids',
+            [name, Change.DELETED, connection.ops.adapt_datetimefield_value(timezone.now()), *ids_params],
+        )
+
+
+def feed_horizon(using):
+    """
+    The xid below which every change is committed, and the xid of the
+    current transaction's own changes (or None). None on other databases
+    than PostgreSQL, whose writers commit in id order.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    function = connection.ops.quote_name(f'{Change._meta.db_table}_horizon')
+    with connection.cursor() as cursor:
+        # Not part of the changes query, whose snapshot would miss writers
+        # that commit before the horizon is read.
+        cursor.execute(f"SELECT {function}(), nullif(current_setting('companies.change_xid', true), '')::bigint")
+        return cursor.fetchone()
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_save, sender=Bank)
+@receiver(post_save, sender=BankAccount)
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record(instance, Change.CREATED if created else Change.UPDATED)
+
+
+@receiver(pre_delete, sender=Company)
+def record_company_bank_account_deletions(sender, instance, **kwargs):
+    record_deletions(BankAccount.objects.filter(company_id=instance.pk))
+
+
+@receiver(pre_delete, sender=Bank)
+def record_bank_bank_account_deletions(sender, instance, **kwargs):
+    record_deletions(BankAccount.objects.filter(bank_id=instance.pk))
+
+
+@receiver(post_delete, sender=Company)
+@receiver(post_delete, sender=Bank)
+def record_delete(sender, instance, **kwargs):
+    record(instance, Change.DELETED)
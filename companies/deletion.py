@@ -0,0 +1,41 @@
+from django.db import transaction
+
+from .changes import record_deletions
+from .jobs import register, submit
+from .models import Company, BankAccount
+
+DELETE_BATCH_SIZE = 10000
+
+
+@register('delete_company')
+def delete_company_in_batches(job):
+    """
+    Delete the bank accounts of a company in short transactions of
+    DELETE_BATCH_SIZE rows, then the company itself.
+    """
+    company_id = job.params['company']
+    total = BankAccount.objects.filter(company_id=company_id).count()
+    deleted = 0
+    job.set_progress(deleted, total)
+    while True:
+        ids = list(
+            BankAccount.objects.filter(company_id=company_id).order_by().values_list('pk', flat=True)[:DELETE_BATCH_SIZE]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # The company filter keeps the delete on its partition.
+            batch = BankAccount.objects.filter(company_id=company_id, pk__in=ids)
+            record_deletions(batch)
+            batch.delete()
+        deleted += len(ids)
+        job.set_progress(deleted)
+    Company.objects.filter(pk=company_id).delete()
+    return {'deleted_bank_accounts': deleted}
+
+
+def start_company_deletion(company, user=None):
+    """
+    Queue a background deletion of `company` and return its Job.
+    """
+    return submit('delete_company', {'company': company.pk}, user)
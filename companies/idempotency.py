@@ -0,0 +1,74 @@
+"""
+Store of `Idempotency-Key` requests, see `views.IdempotentWriteMixin`.
+
+A request with a key inserts the key's row, ignoring a conflict, and
+locks it in the request's transaction. A concurrent duplicate waits on the
+insert until the first request commits or rolls back, then finds its
+response, so duplicates are serialized. Failed writes roll back the row
+and can be retried with the same key.
+
+Expired rows are reused when their key comes back and deleted by
+`manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was already used with a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+def request_hash(request):
+    """
+    Hash of the method, path and parsed body, so formatting doesn't matter.
+    """
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(f'{request.method} {request.get_full_path()}\n{body}'.encode()).hexdigest()
+
+
+def claim(request, key):
+    """
+    The locked IdempotencyKey row of `key` for `request.user`, with no
+    `status_code` if this request is the one to make the write. Must be
+    called in a transaction.
+    """
+    if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        raise ValidationError({HEADER: ['Ensure this value has at most 255 characters.']})
+    now = timezone.now()
+    fingerprint = request_hash(request)
+    IdempotencyKey.objects.bulk_create(
+        [IdempotencyKey(
+            user=request.user, key=key, request_hash=fingerprint,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+        )],
+        ignore_conflicts=True,
+    )
+    record = IdempotencyKey.objects.select_for_update().get(user=request.user, key=key)
+    if record.status_code is not None and record.expires_at <= now:
+        # Expired, start over as if the key were new.
+        record.request_hash = fingerprint
+        record.status_code = record.response = None
+        record.created_at = now
+        record.expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    elif record.request_hash != fingerprint:
+        raise IdempotencyKeyReused()
+    return record
+
+
+def store(record, response):
+    record.status_code = response.status_code
+    record.response = response.data
+    record.save()
@@ -0,0 +1,110 @@
+"""
+Background jobs stored in the `Job` table and run by `manage.py run_workers`.
+
+Handlers are registered per job kind with `@register('kind')` and receive
+the `Job`; they report progress with `job.set_progress()` and may return a
+JSON serializable result.
+
+A running job is leased to its worker for JOB_LEASE_SECONDS, renewed by
+`job.set_progress()` and `job.heartbeat()`, so handlers must call one of
+them at least that often. Jobs whose worker died with them are claimed
+again when their lease expires, up to JOB_MAX_ATTEMPTS runs in total, so
+handlers must be safe to run again.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def register(kind):
+    def decorator(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def submit(kind, params=None, user=None):
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown job kind "{kind}".')
+    return Job.objects.create(kind=kind, params=params or {}, created_by=user)
+
+
+def claim_job():
+    """
+    Mark the oldest pending job, or running job whose lease expired, as
+    running and return it, or None. Expired jobs out of attempts fail.
+
+    SKIP LOCKED lets many workers poll the table without blocking on the
+    rows another worker is claiming.
+    """
+    while True:
+        with transaction.atomic():
+            now = timezone.now()
+            expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=Job.PENDING)
+                    | Q(status=Job.RUNNING, heartbeat_at__lt=expired)
+                    | Q(status=Job.RUNNING, heartbeat_at__isnull=True)
+                )
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                job.status = Job.FAILED
+                job.error = f'The worker stopped responding, {job.attempts} attempts made.'
+                job.finished_at = now
+                job.save(update_fields=['status', 'error', 'finished_at'])
+                continue
+            job.status = Job.RUNNING
+            job.started_at = job.heartbeat_at = now
+            job.attempts += 1
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at', 'attempts'])
+        return job
+
+
+def _finish(job, **fields):
+    # A worker whose lease expired lost the job to another attempt.
+    fields['finished_at'] = timezone.now()
+    if not Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(**fields):
+        logger.warning('Job %s was claimed again by another worker', job)
+    for field, value in fields.items():
+        setattr(job, field, value)
+
+
+def run_job(job):
+    try:
+        result = HANDLERS[job.kind](job)
+    except Exception:
+        logger.exception('Job %s failed', job)
+        _finish(job, status=Job.FAILED, error=traceback.format_exc())
+        return job
+    _finish(job, status=Job.DONE, result=result)
+    return job
+
+
+def run_pending():
+    """
+    Run pending jobs until none are left. Returns the number of jobs run.
+    """
+    count = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            return count
+        run_job(job)
+        count += 1
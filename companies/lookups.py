@@ -0,0 +1,25 @@
+from django.db import models
+from django.db.models.lookups import In
+
+
+@models.IntegerField.register_lookup
+class Any(models.Lookup):
+    """
+    `pk__any=[1, 2, 3]` matches any of the values.
+
+    On PostgreSQL it compiles to `= ANY(%s)` with the values as a single
+    array parameter, so the statement is the same however many values are
+    passed. Other databases use IN.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_prep_lookup(self):
+        return [self.lhs.output_field.get_prep_value(value) for value in self.rhs]
+
+    def as_sql(self, compiler, connection):
+        return In(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f'{lhs} = ANY(%s)', [*lhs_params, self.rhs]
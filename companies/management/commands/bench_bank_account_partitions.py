@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from companies.partitioning import create_partitioned_table
+
+PLAIN_TABLE = "bench_bankaccount_plain"
+PARTITIONED_TABLE = "bench_bankaccount_hash"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark looking up the bank accounts of a company in a plain table vs one hash-partitioned "
+        "by company. Both tables are created for the run and dropped afterwards. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000000)
+        parser.add_argument("--companies", type=int, default=1000000)
+        parser.add_argument("--partitions", type=int, default=16)
+        parser.add_argument("--lookups", type=int, default=1000)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def seed(self, cursor, rows, companies, partitions):
+        cursor.execute(
+            f'CREATE UNLOGGED TABLE "{PLAIN_TABLE}" ('
+            f"id bigint NOT NULL, account_number varchar(10) NOT NULL, bank_id bigint NOT NULL, "
+            f"company_id bigint NOT NULL, agency varchar(8) NOT NULL)"
+        )
+        cursor.execute(
+            f'INSERT INTO "{PLAIN_TABLE}" '
+            f"SELECT i, lpad(i::text, 10, '0'), 1 + i %% 100, 1 + i %% %s, '0001' FROM generate_series(1, %s) i",
+            [companies, rows],
+        )
+        cursor.execute(f'ALTER TABLE "{PLAIN_TABLE}" ADD PRIMARY KEY (id)')
+        for column in ("company_id", "bank_id", "account_number"):
+            cursor.execute(f'CREATE INDEX "{PLAIN_TABLE}_{column}_idx" ON "{PLAIN_TABLE}" ({column})')
+        create_partitioned_table(cursor, PLAIN_TABLE, PARTITIONED_TABLE, partitions)
+        cursor.execute(f'INSERT INTO "{PARTITIONED_TABLE}" SELECT * FROM "{PLAIN_TABLE}"')
+        cursor.execute(f'ANALYZE "{PLAIN_TABLE}"')
+        cursor.execute(f'ANALYZE "{PARTITIONED_TABLE}"')
+
+    def size(self, cursor, table):
+        cursor.execute(
+            "SELECT coalesce(sum(pg_total_relation_size(relid)), pg_total_relation_size(%s)) "
+            "FROM pg_partition_tree(%s) WHERE isleaf",
+            [table, table],
+        )
+        return cursor.fetchone()[0]
+
+    def lookups(self, label, cursor, table, company_ids):
+        timings = []
+        for company_id in company_ids:
+            start = time.perf_counter()
+            cursor.execute(f'SELECT id, bank_id, account_number, agency FROM "{table}" WHERE company_id = %s', [company_id])
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(
+            f"{label:<20} mean {statistics.mean(timings) * 1000:7.3f}ms  "
+            f"p50 {timings[len(timings) // 2] * 1000:7.3f}ms  "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1000:7.3f}ms  "
+            f"size {self.size(cursor, table) / 2 ** 20:10.1f}MB"
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is only supported on PostgreSQL.")
+        self.stdout.write(
+            f"Looking up the accounts of {options['lookups']} companies among {options['rows']} accounts "
+            f"of {options['companies']} companies"
+        )
+        company_ids = [random.randint(1, options["companies"]) for _ in range(options["lookups"])]
+        with connection.cursor() as cursor:
+            try:
+                self.seed(cursor, options["rows"], options["companies"], options["partitions"])
+                for label in ("cold", "warm"):
+                    self.lookups(f"plain ({label})", cursor, PLAIN_TABLE, company_ids)
+                    self.lookups(f"partitioned ({label})", cursor, PARTITIONED_TABLE, company_ids)
+            finally:
+                cursor.execute(f'DROP TABLE IF EXISTS "{PLAIN_TABLE}", "{PARTITIONED_TABLE}"')
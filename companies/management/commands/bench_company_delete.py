@@ -0,0 +1,69 @@
+import time
+
+from django.db import transaction
+from django.db.models import signals
+from django.core.management.base import BaseCommand
+
+from companies.deletion import delete_company_in_batches
+from companies.models import Bank, Company, BankAccount, Job
+
+
+class Rollback(Exception):
+    pass
+
+
+def _per_row_receiver(sender, **kwargs):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark deleting a company with many bank accounts. "
+        "All rows are created and deleted inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--accounts", type=int, default=100000)
+
+    def seed(self, accounts):
+        bank = Bank.objects.create(code="999", name="Benchmark bank")
+        company = Company.objects.create(
+            name="Benchmark company", phone="+5548995481447", address="-", city="-", state="-", country="-",
+            earnings_declared=0,
+        )
+        BankAccount.objects.bulk_create(
+            (BankAccount(bank=bank, company=company, account_number=f"{i:010d}", agency="0001") for i in range(accounts)),
+            batch_size=5000,
+        )
+        return company
+
+    def run(self, label, accounts, delete):
+        try:
+            with transaction.atomic():
+                company = self.seed(accounts)
+                start = time.perf_counter()
+                delete(company)
+                elapsed = time.perf_counter() - start
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(f"{label:<28} {elapsed:8.3f}s")
+
+    def handle(self, *args, **options):
+        accounts = options["accounts"]
+        self.stdout.write(f"Deleting a company with {accounts} bank accounts")
+
+        self.run("set based (default)", accounts, lambda company: company.delete())
+
+        # A delete receiver forces Django's collector to load and delete row by row.
+        signals.post_delete.connect(_per_row_receiver, sender=BankAccount)
+        try:
+            self.run("collector (per row signals)", accounts, lambda company: company.delete())
+        finally:
+            signals.post_delete.disconnect(_per_row_receiver, sender=BankAccount)
+
+        self.run(
+            "background batches",
+            accounts,
+            lambda company: delete_company_in_batches(Job.objects.create(kind="delete_company", params={"company": company.pk})),
+        )
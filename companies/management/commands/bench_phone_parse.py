@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from phonenumber_field.phonenumber import to_python
+
+from companies import phones
+
+
+class Command(BaseCommand):
+    help = "Benchmark phone number parsing and formatting per N rows, uncached vs cached."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def time(self, label, values, load, dump):
+        start = time.perf_counter()
+        for value in values:
+            dump(load(value))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"{label:<16} {elapsed * 1000:9.1f}ms")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        # Stored values are E.164, as written by the model field.
+        values = [f"+55489{index:08d}" for index in range(rows)]
+        self.stdout.write(f"Loading and serializing {rows} phone numbers")
+
+        self.time("uncached", values, to_python, str)
+        phones._parse.cache_clear()
+        phones._format.cache_clear()
+        self.time("cached (cold)", values, phones.parse, phones.format_phone)
+        self.time("cached (warm)", values, phones.parse, phones.format_phone)
@@ -0,0 +1,76 @@
+import time
+
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from companies.models import Bank, Company, BankAccount
+from companies.renderers import ColumnarJSONRenderer, MessagePackRenderer, msgpack
+from companies.serializers import CompanySerializer
+from CompaniesAPI.middleware import ENCODERS
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark bytes on the wire and encode CPU time of the company list per format and compression. "
+        "All rows are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=10000)
+        parser.add_argument("--accounts", type=int, default=3, help="Bank accounts per company.")
+
+    def seed(self, companies, accounts):
+        bank = Bank.objects.create(code="999", name="Benchmark bank")
+        Company.objects.bulk_create(
+            (
+                Company(
+                    name=f"Benchmark company {i}", phone=f"+55489{i:08d}", address="Rua Benchmark, 100",
+                    city="Florianopolis", state="SC", country="Brazil", earnings_declared=1000000 + i,
+                )
+                for i in range(companies)
+            ),
+            batch_size=5000,
+        )
+        BankAccount.objects.bulk_create(
+            (
+                BankAccount(bank=bank, company=company, account_number=f"{company.pk}{i:04d}", agency="0001")
+                for company in Company.objects.all()
+                for i in range(accounts)
+            ),
+            batch_size=5000,
+        )
+        return CompanySerializer(Company.objects.prefetch_related("bank_accounts"), many=True).data
+
+    def cpu_time(self, function, *args):
+        start = time.process_time()
+        result = function(*args)
+        return result, time.process_time() - start
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                data = self.seed(options["companies"], options["accounts"])
+                raise Rollback
+        except Rollback:
+            pass
+
+        renderers = [JSONRenderer(), ColumnarJSONRenderer()]
+        if msgpack is not None:
+            renderers.append(MessagePackRenderer())
+        encoders = [("identity", None), *reversed(ENCODERS)]
+
+        self.stdout.write(f"Rendering {len(data)} companies with {options['accounts']} bank accounts each")
+        self.stdout.write(f"{'format':<32} {'encoding':<9} {'bytes':>12} {'render':>10} {'compress':>10}")
+        for renderer in renderers:
+            body, render_time = self.cpu_time(renderer.render, data)
+            for coding, compress in encoders:
+                compressed, compress_time = self.cpu_time(compress, body) if compress else (body, 0.0)
+                self.stdout.write(
+                    f"{renderer.media_type:<32} {coding:<9} {len(compressed):>12} "
+                    f"{render_time * 1000:>8.1f}ms {compress_time * 1000:>8.1f}ms"
+                )
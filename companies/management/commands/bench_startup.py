@@ -0,0 +1,81 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+# Boots the WSGI application in a fresh interpreter and serves one request.
+FIRST_REQUEST = """
+import json, time
+start = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+from CompaniesAPI.wsgi import application
+environ = {"PATH_INFO": %(path)r, "HTTP_HOST": "localhost"}
+setup_testing_defaults(environ)
+status = []
+body = b"".join(application(environ, lambda code, headers: status.append(code)))
+print(json.dumps({"status": status[0], "seconds": time.perf_counter() - start}))
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+# Packages the API profile keeps DRF from importing, see settings_api.
+LEFT_OUT = ("coreapi", "coreschema")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker cold start: import time (python -X importtime) and time to first request "
+        "for each settings module."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settings-modules", nargs="+", default=["CompaniesAPI.settings", "CompaniesAPI.settings_api"]
+        )
+        parser.add_argument("--path", default="/api/v1/companies/", help="Path of the first request.")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=5, help="Show the N packages that take longest to import.")
+
+    def boot(self, settings_module, path):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", FIRST_REQUEST % {"path": path}],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        packages = {}
+        modules = 0
+        left_out = 0
+        for line in process.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                modules += 1
+                package = match.group(4).split(".")[0]
+                packages[package] = packages.get(package, 0) + int(match.group(1))
+                if match.group(4) in LEFT_OUT:
+                    # Cumulative, with the dependencies imported first by them.
+                    left_out += int(match.group(2))
+        result["import_seconds"] = sum(packages.values()) / 1e6
+        result["modules"] = modules
+        result["left_out_seconds"] = left_out / 1e6
+        result["top"] = sorted(((self_time, package) for package, self_time in packages.items()), reverse=True)
+        return result
+
+    def handle(self, *args, **options):
+        for settings_module in options["settings_modules"]:
+            runs = [self.boot(settings_module, options["path"]) for _ in range(options["runs"])]
+            best = min(runs, key=lambda run: run["seconds"])
+            self.stdout.write(
+                f"{settings_module}: first request {best['seconds'] * 1000:.0f}ms "
+                f"(status {best['status']}), imports {best['import_seconds'] * 1000:.0f}ms, "
+                f"{best['modules']} modules"
+            )
+            self.stdout.write(
+                f"    {', '.join(LEFT_OUT)} (left out of CompaniesAPI.settings_api): "
+                f"{best['left_out_seconds'] * 1000:.0f}ms"
+            )
+            for self_time, package in best["top"][:options["top"]]:
+                self.stdout.write(f"    {self_time / 1000:8.1f}ms  {package}")
@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Show how many requests were served by the primary database and by replicas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them.")
+
+    def handle(self, *args, **options):
+        counts = cache.get_many(["db_route_primary", "db_route_replica"])
+        primary = counts.get("db_route_primary", 0)
+        replica = counts.get("db_route_replica", 0)
+        total = primary + replica
+        share = replica / total * 100 if total else 0
+        self.stdout.write(f"primary: {primary}")
+        self.stdout.write(f"replica: {replica}")
+        self.stdout.write(f"replica share: {share:.1f}%")
+        if options["reset"]:
+            cache.delete_many(["db_route_primary", "db_route_replica"])
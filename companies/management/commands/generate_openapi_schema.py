@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from CompaniesAPI.schema import generate_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served at /openapi."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true", help="Exit with an error if the schema file is out of date."
+        )
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        path = settings.OPENAPI_SCHEMA_FILE
+        if options["check"]:
+            try:
+                with open(path, "rb") as schema_file:
+                    current = schema_file.read()
+            except FileNotFoundError:
+                current = None
+            if current != schema:
+                raise CommandError(f"{path} is out of date. Run `python manage.py generate_openapi_schema`.")
+            self.stdout.write("OpenAPI schema is up to date.")
+            return
+        with open(path, "wb") as schema_file:
+            schema_file.write(schema)
+        self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,63 @@
+import io
+import pstats
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from CompaniesAPI.profiling import list_profiles
+
+
+class Command(BaseCommand):
+    help = "List the stored request profiles, newest first, or summarize one of them with --show."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20, help="Profiles to list, or lines to summarize.")
+        parser.add_argument("--path", help="Only list profiles of request paths starting with this.")
+        parser.add_argument("--show", metavar="NAME", help="Summarize the profile with this name.")
+        parser.add_argument(
+            "--sort", default="cumulative", help="pstats sort key of cProfile summaries (cumulative, tottime, ...)."
+        )
+
+    def handle(self, *args, **options):
+        profiles = list_profiles()
+        if options["show"]:
+            profile = next((profile for profile in profiles if profile["name"] == options["show"]), None)
+            if profile is None:
+                raise CommandError(f"No profile named {options['show']}.")
+            self.show(profile, options["limit"], options["sort"])
+            return
+
+        if options["path"]:
+            profiles = [profile for profile in profiles if profile["path"].startswith(options["path"])]
+        for profile in profiles[:options["limit"]]:
+            self.stdout.write(
+                f"{profile['name']}  {profile['reason']:<6} {profile['duration'] * 1000:9.1f} ms  "
+                f"{profile['status']} {profile['method']} {profile['path']}"
+            )
+        self.stdout.write(f"{len(profiles)} profiles")
+
+    def show(self, profile, limit, sort):
+        query = f"?{profile['query_string']}" if profile["query_string"] else ""
+        self.stdout.write(f"{profile['method']} {profile['path']}{query} -> {profile['status']}")
+        self.stdout.write(f"view: {profile['view']}, {profile['duration'] * 1000:.1f} ms, reason: {profile['reason']}")
+        self.stdout.write(f"file: {profile['file']}")
+        if profile["kind"] == "cprofile":
+            output = io.StringIO()
+            pstats.Stats(profile["file"], stream=output).sort_stats(sort).print_stats(limit)
+            self.stdout.write(output.getvalue())
+            return
+
+        stacks = Counter()
+        with open(profile["file"]) as collapsed:
+            for line in collapsed:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                stacks[stack] += int(count)
+        total = sum(stacks.values())
+        # Samples in which each function was on the stack, like cumulative time.
+        functions = Counter()
+        for stack, count in stacks.items():
+            for function in set(stack.split(";")):
+                functions[function] += count
+        self.stdout.write(f"{total} samples, functions by share of samples:")
+        for function, count in functions.most_common(limit):
+            self.stdout.write(f"{count / total * 100:6.1f}%  {function}")
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from companies import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the bank account table to a PostgreSQL table hash-partitioned by company, "
+        "copying the rows in batches while it stays writable. Running it again resumes a conversion "
+        "that stopped before the swap, --abort undoes it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--partitions", type=int, default=settings.BANK_ACCOUNT_PARTITIONS or 16)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--drop-old", action="store_true", help="Drop the unpartitioned table kept by a previous conversion."
+        )
+        parser.add_argument(
+            "--abort", action="store_true",
+            help="Drop the partitioned copy and mirror trigger of a conversion that stopped before the swap.",
+        )
+
+    def progress(self, copied, total):
+        self.stdout.write(f"Copied rows up to id {copied} of {total}")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is only supported on PostgreSQL.")
+        if options["drop_old"]:
+            partitioning.drop_old(connection)
+            self.stdout.write(f"Dropped {partitioning.OLD_TABLE}")
+            return
+        if options["abort"]:
+            if partitioning.is_partitioned(connection):
+                raise CommandError(f"{partitioning.TABLE} is already partitioned, there is nothing to abort.")
+            partitioning.abort(connection)
+            self.stdout.write(f"Aborted the conversion of {partitioning.TABLE}")
+            return
+        if options["partitions"] < 2:
+            raise CommandError("--partitions must be at least 2.")
+
+        if partitioning.is_prepared(connection):
+            self.stdout.write(f"Resuming the conversion of {partitioning.TABLE}")
+        if not partitioning.partition_bank_accounts(
+            connection, options["partitions"], options["batch_size"], self.progress
+        ):
+            count = partitioning.partition_count(connection)
+            self.stdout.write(f"{partitioning.TABLE} is already partitioned ({count} partitions)")
+            return
+        self.stdout.write(
+            f"Partitioned {partitioning.TABLE} into {partitioning.partition_count(connection)} partitions. "
+            f"Run with --drop-old to drop {partitioning.OLD_TABLE} once checked."
+        )
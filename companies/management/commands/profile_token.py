@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from CompaniesAPI.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile-Token header value that makes the request be profiled with cProfile."
+
+    def handle(self, *args, **options):
+        if not settings.PROFILE_TOKEN_MAX_AGE:
+            raise CommandError("Profile tokens are disabled, set PROFILE_TOKEN_MAX_AGE.")
+        self.stdout.write(make_token())
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from companies.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key responses, in batches through the expires_at index. Run it periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:options["batch_size"]]
+            )
+            if not ids:
+                break
+            # Keys claimed again since they were picked are live, the delete
+            # checks the expiry again once it has their row lock.
+            deleted += IdempotencyKey.objects.filter(pk__in=ids, expires_at__lte=now).delete()[0]
+        self.stdout.write(f"deleted {deleted} expired idempotency keys")
@@ -0,0 +1,61 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from companies.jobs import claim_job, run_job
+
+
+def work(poll_interval, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while not stop.is_set():
+        close_old_connections()
+        job = claim_job()
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        run_job(job)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run a pool of worker processes executing queued jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        stop = multiprocessing.Event()
+        # Forked children must not share the parent's database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=work, args=(options["poll_interval"], stop), name=f"job-worker-{index}")
+            for index in range(options["processes"])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} workers")
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        try:
+            while not stop.is_set():
+                # Restart workers that died, e.g. killed by the OOM killer.
+                for index, worker in enumerate(workers):
+                    if not worker.is_alive():
+                        workers[index] = multiprocessing.Process(
+                            target=work, args=(options["poll_interval"], stop), name=worker.name
+                        )
+                        workers[index].start()
+                time.sleep(1)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write("Workers stopped")
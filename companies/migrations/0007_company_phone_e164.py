@@ -0,0 +1,26 @@
+# Generated by Django 4.1.5 on 2026-10-19 10:59
+
+import companies.phones
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0006_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="company",
+            name="phone_e164",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=16
+            ),
+        ),
+        migrations.AlterField(
+            model_name="company",
+            name="phone",
+            field=companies.phones.CachedPhoneNumberField(max_length=128, region=None),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0007_company_phone_e164"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bank",
+            name="code",
+            field=models.CharField(db_index=True, max_length=3),
+        ),
+        migrations.AlterField(
+            model_name="bankaccount",
+            name="account_number",
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+    ]
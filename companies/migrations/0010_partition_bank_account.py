@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import migrations
+
+from companies.partitioning import partition_bank_accounts
+
+
+def partition(apps, schema_editor):
+    # Opt-in, see BANK_ACCOUNT_PARTITIONS. Run `manage.py partition_bank_accounts`
+    # to convert the table later.
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql" and settings.BANK_ACCOUNT_PARTITIONS:
+        # The historical model, so later model changes don't change what this does.
+        model = apps.get_model("companies", "BankAccount")
+        partition_bank_accounts(connection, settings.BANK_ACCOUNT_PARTITIONS, model=model)
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("companies", "0009_change"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, migrations.RunPython.noop, elidable=True),
+    ]
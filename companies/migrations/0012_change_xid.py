@@ -0,0 +1,51 @@
+# Generated by Django 4.1.5 on 2026-10-19 11:43
+
+from django.db import migrations, models
+
+
+def create_xid_trigger(apps, schema_editor):
+    # The transaction id is only known to the database, so it is set at insert.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("companies", "Change")._meta.db_table
+    schema_editor.execute(
+        f"""
+        CREATE FUNCTION "{table}_xid"() RETURNS trigger AS $$
+        BEGIN
+            NEW.xid := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER "{table}_xid" BEFORE INSERT ON "{table}" FOR EACH ROW EXECUTE FUNCTION "{table}_xid"()'
+    )
+
+
+def drop_xid_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("companies", "Change")._meta.db_table
+    schema_editor.execute(f'DROP TRIGGER IF EXISTS "{table}_xid" ON "{table}"')
+    schema_editor.execute(f'DROP FUNCTION IF EXISTS "{table}_xid"()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0011_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='change',
+            name='xid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['xid', 'id'], name='companies_c_xid_1d7527_idx'),
+        ),
+        migrations.RunPython(create_xid_trigger, drop_xid_trigger),
+    ]
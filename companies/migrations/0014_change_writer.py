@@ -0,0 +1,109 @@
+from django.db import migrations
+
+# Taken shared by writers while they take their number, and exclusively by
+# readers of the horizon.
+WRITER_LOCK = 1667786343
+
+
+def number_writers(apps, schema_editor):
+    # Transaction ids are shared by the whole server, so waiting for every
+    # older transaction held the feed back on transactions that never wrote
+    # a change, in any database. Writers of changes now take a number from a
+    # sequence on their first change and hold an advisory lock on it until
+    # they end, which is all the feed waits for.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("companies", "Change")._meta.db_table
+    schema_editor.execute(f'CREATE SEQUENCE "{table}_xid_seq"')
+    # Numbers keep sorting after the transaction ids already in the log.
+    schema_editor.execute(
+        f"""
+        SELECT setval('"{table}_xid_seq"', greatest(
+            (SELECT max(xid) FROM "{table}"), pg_current_xact_id()::text::bigint
+        ))
+        """
+    )
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION "{table}_xid"() RETURNS trigger AS $$
+        DECLARE
+            writer bigint := nullif(current_setting('companies.change_xid', true), '')::bigint;
+        BEGIN
+            IF writer IS NULL THEN
+                -- Readers take this lock exclusively, so they never see a
+                -- number handed out without its lock.
+                PERFORM pg_advisory_lock_shared({WRITER_LOCK}, 0);
+                BEGIN
+                    writer := nextval('"{table}_xid_seq"');
+                    PERFORM pg_advisory_xact_lock(writer);
+                EXCEPTION WHEN OTHERS OR query_canceled THEN
+                    PERFORM pg_advisory_unlock_shared({WRITER_LOCK}, 0);
+                    RAISE;
+                END;
+                PERFORM pg_advisory_unlock_shared({WRITER_LOCK}, 0);
+                PERFORM set_config('companies.change_xid', writer::text, true);
+            END IF;
+            NEW.xid := writer;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    # The lowest number still locked by a writer of this database, or the
+    # next number if there are none. No change can appear below it anymore.
+    schema_editor.execute(
+        f"""
+        CREATE FUNCTION "{table}_horizon"() RETURNS bigint AS $$
+        DECLARE
+            horizon bigint;
+        BEGIN
+            -- Waits for writers taking their number, which is locked by then.
+            PERFORM pg_advisory_lock({WRITER_LOCK}, 0);
+            BEGIN
+                SELECT least(
+                    (
+                        SELECT min((classid::bigint << 32) | objid::bigint) FROM pg_locks
+                        WHERE locktype = 'advisory' AND objsubid = 1 AND granted
+                        AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+                    ),
+                    (SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM "{table}_xid_seq")
+                ) INTO horizon;
+            EXCEPTION WHEN OTHERS OR query_canceled THEN
+                PERFORM pg_advisory_unlock({WRITER_LOCK}, 0);
+                RAISE;
+            END;
+            PERFORM pg_advisory_unlock({WRITER_LOCK}, 0);
+            RETURN horizon;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+
+
+def number_transactions(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("companies", "Change")._meta.db_table
+    schema_editor.execute(f'DROP FUNCTION IF EXISTS "{table}_horizon"()')
+    schema_editor.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION "{table}_xid"() RETURNS trigger AS $$
+        BEGIN
+            NEW.xid := pg_current_xact_id()::text::bigint;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    schema_editor.execute(f'DROP SEQUENCE IF EXISTS "{table}_xid_seq"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0013_job_lease'),
+    ]
+
+    operations = [
+        migrations.RunPython(number_writers, number_transactions),
+    ]
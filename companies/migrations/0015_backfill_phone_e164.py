@@ -0,0 +1,41 @@
+import companies.phones
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def backfill_phone_e164(apps, schema_editor):
+    # Not part of 0007, whose ALTER TABLE lock would otherwise be held on
+    # companies_company until every batch is written. Databases that ran the
+    # backfill in 0007 only go through the phones that don't parse again.
+    Company = apps.get_model("companies", "Company")
+    alias = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=alias):
+            batch = list(
+                Company.objects.using(alias).filter(pk__gt=last_pk, phone_e164="").order_by("pk").only("phone")[
+                    :BATCH_SIZE
+                ]
+            )
+            for company in batch:
+                company.phone_e164 = companies.phones.to_e164(company.phone)
+            Company.objects.using(alias).bulk_update(
+                [company for company in batch if company.phone_e164], ["phone_e164"]
+            )
+        if len(batch) < BATCH_SIZE:
+            break
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("companies", "0014_change_writer"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_phone_e164, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,9 +1,12 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from phonenumber_field.modelfields import PhoneNumberField
+from django.utils import timezone
+from .phones import CachedPhoneNumberField, to_e164
 
 
 class Bank(models.Model):
-    code = models.CharField(max_length=3)
+    code = models.CharField(max_length=3, db_index=True)
     name = models.TextField(max_length=255)
 
     def __str__(self):
@@ -12,7 +15,8 @@ class Bank(models.Model):
 
 class Company(models.Model):
     name = models.TextField(max_length=255)
-    phone = PhoneNumberField()
+    phone = CachedPhoneNumberField()
+    phone_e164 = models.CharField(max_length=16, blank=True, db_index=True, editable=False)
     address = models.TextField(max_length=255)
     address_additional_info = models.TextField(blank=True, null=True, max_length=255)
     city = models.TextField(max_length=85)
@@ -25,12 +29,133 @@ class Company(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Normalized once here so lookups by phone can use the index.
+        self.phone_e164 = to_e164(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_e164'}
+        super().save(*args, **kwargs)
+
 
 class BankAccount(models.Model):
     bank = models.ForeignKey(Bank, on_delete=models.CASCADE)
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
-    account_number = models.CharField(max_length=10)
+    account_number = models.CharField(max_length=10, db_index=True)
     agency = models.CharField(max_length=8)
 
     def __str__(self):
         return self.account_number
+
+
+class Job(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, blank=True, null=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Refreshed by the running worker, see `jobs.claim_job`.
+    heartbeat_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending job.
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.pk}'
+
+    def set_progress(self, progress, total=None):
+        """
+        Also renews the worker's lease on the job.
+        """
+        self.progress = progress
+        self.heartbeat_at = timezone.now()
+        fields = ['progress', 'heartbeat_at']
+        if total is not None:
+            self.total = total
+            fields.append('total')
+        Job.objects.filter(pk=self.pk).update(**{field: getattr(self, field) for field in fields})
+
+    def heartbeat(self):
+        """
+        Renew the worker's lease on the job without reporting progress.
+        """
+        self.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(heartbeat_at=self.heartbeat_at)
+
+
+class Change(models.Model):
+    """
+    Append-only log of writes to Company, Bank and BankAccount, read by the
+    change feed in (xid, id) order, which is the feed cursor.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Serialized object, None for deletions.
+    data = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Number of the writing transaction, handed out by a trigger on Postgres
+    # on its first change, see `changes`. 0 on other databases, whose writers
+    # commit in id order.
+    xid = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['xid', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.model} {self.object_id}'
+
+
+class IdempotencyKey(models.Model):
+    """
+    A write made with an `Idempotency-Key` header and its response, which
+    retries with the same key get instead of writing again until it expires.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    # Empty until the request that claimed the key commits its response.
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    response = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return self.key
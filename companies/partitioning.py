@@ -0,0 +1,210 @@
+"""
+Online conversion of the BankAccount table to a Postgres table
+hash-partitioned by company_id.
+
+The conversion runs in steps that each hold locks briefly:
+
+1. `prepare`: create the partitioned copy and a trigger mirroring every
+   write on the current table into it.
+2. `backfill`: copy the existing rows in batches of `batch_size`, each in
+   its own transaction.
+3. `swap`: lock the current table for a moment, point the id sequence at
+   the copy and rename the copy into place. The old table is kept as
+   `<table>_old` until `drop_old` is run.
+
+A conversion that stopped before the swap (e.g. on its lock timeout) is
+resumed by running it again, or undone by `abort`.
+
+Queries filtering on company_id (a company's accounts, cascade deletes)
+then only touch one partition. The primary key becomes (id, company_id),
+as Postgres requires the partition key in unique constraints; ids still
+come from a single sequence.
+
+Every step takes the model to convert, so migrations can pass their
+historical model.
+"""
+from django.db import transaction
+
+from .models import BankAccount
+
+
+class Names:
+    """
+    Names of the tables, sequence and trigger used to convert `model`.
+    """
+
+    def __init__(self, model=BankAccount):
+        self.table = model._meta.db_table
+        self.new_table = f'{self.table}_partitioned'
+        self.old_table = f'{self.table}_old'
+        self.sequence = f'{self.new_table}_id_seq'
+        self.trigger = f'{self.table}_mirror'
+        self.bank_table = model._meta.get_field('bank').related_model._meta.db_table
+        self.company_table = model._meta.get_field('company').related_model._meta.db_table
+
+
+TABLE = Names().table
+OLD_TABLE = Names().old_table
+
+
+def is_partitioned(connection, table=TABLE):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def partition_count(connection, table=TABLE):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(%s)", [table])
+        return cursor.fetchone()[0]
+
+
+def create_partitioned_table(cursor, source, table, partitions):
+    """
+    Create `table` with the columns of `source`, hash-partitioned by
+    company_id into `partitions` tables.
+    """
+    cursor.execute(f'CREATE TABLE "{table}" (LIKE "{source}") PARTITION BY HASH (company_id)')
+    cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, company_id)')
+    for remainder in range(partitions):
+        cursor.execute(
+            f'CREATE TABLE "{table}_p{remainder}" PARTITION OF "{table}" '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+        )
+    for column in ('company_id', 'bank_id', 'account_number'):
+        cursor.execute(f'CREATE INDEX "{table}_{column}_idx" ON "{table}" ({column})')
+
+
+def is_prepared(connection, model=BankAccount):
+    """
+    Whether `prepare` ran and the conversion wasn't swapped or aborted since.
+    """
+    names = Names(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass(%s) IS NOT NULL AND EXISTS ("
+            "SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = to_regclass(%s))",
+            [names.new_table, names.trigger, names.table],
+        )
+        return cursor.fetchone()[0]
+
+
+def prepare(connection, partitions, model=BankAccount):
+    names = Names(model)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        create_partitioned_table(cursor, names.table, names.new_table, partitions)
+        cursor.execute(
+            f'ALTER TABLE "{names.new_table}" ADD CONSTRAINT "{names.new_table}_bank_id_fk" '
+            f'FOREIGN KEY (bank_id) REFERENCES "{names.bank_table}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(
+            f'ALTER TABLE "{names.new_table}" ADD CONSTRAINT "{names.new_table}_company_id_fk" '
+            f'FOREIGN KEY (company_id) REFERENCES "{names.company_table}" (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE SEQUENCE "{names.sequence}"')
+        cursor.execute(f'''
+            CREATE FUNCTION "{names.trigger}"() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    DELETE FROM "{names.new_table}" WHERE id = OLD.id AND company_id = OLD.company_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO "{names.new_table}" SELECT NEW.* ON CONFLICT DO NOTHING;
+                END IF;
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute(
+            f'CREATE TRIGGER "{names.trigger}" AFTER INSERT OR UPDATE OR DELETE ON "{names.table}" '
+            f'FOR EACH ROW EXECUTE FUNCTION "{names.trigger}"()'
+        )
+
+
+def backfill(connection, batch_size, progress=None, model=BankAccount):
+    """
+    Copy the rows of the current table in id order. FOR SHARE makes
+    concurrent updates and deletes of a batch wait until it is copied, so
+    the trigger applies them to the copy. Rows copied by an earlier run
+    are skipped.
+    """
+    names = Names(model)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT coalesce(max(id), 0) FROM "{names.table}"')
+        last_id = cursor.fetchone()[0]
+    start = 0
+    while start < last_id:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO "{names.new_table}" SELECT * FROM "{names.table}" '
+                f'WHERE id > %s AND id <= %s FOR SHARE ON CONFLICT DO NOTHING',
+                [start, start + batch_size],
+            )
+        start += batch_size
+        if progress:
+            progress(min(start, last_id), last_id)
+
+
+def swap(connection, model=BankAccount):
+    names = Names(model)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        # Check the deferred foreign keys of rows copied in an enclosing
+        # transaction, ALTER TABLE refuses tables with pending checks.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        # Give up rather than queue every query behind a long transaction.
+        cursor.execute("SET LOCAL lock_timeout = '5s'")
+        cursor.execute(f'LOCK TABLE "{names.table}" IN ACCESS EXCLUSIVE MODE')
+        # Continue after the current sequence so ids of deleted rows are not reused.
+        cursor.execute(
+            f"SELECT setval(%s, greatest((SELECT max(id) FROM \"{names.table}\"), "
+            f"pg_sequence_last_value(pg_get_serial_sequence(%s, 'id')::regclass), 1))",
+            [names.sequence, names.table],
+        )
+        cursor.execute(
+            f'ALTER TABLE "{names.new_table}" ALTER COLUMN id SET DEFAULT nextval(\'"{names.sequence}"\')'
+        )
+        cursor.execute(f'ALTER SEQUENCE "{names.sequence}" OWNED BY "{names.new_table}".id')
+        cursor.execute(f'DROP TRIGGER "{names.trigger}" ON "{names.table}"')
+        cursor.execute(f'DROP FUNCTION "{names.trigger}"()')
+        cursor.execute(f'ALTER TABLE "{names.table}" RENAME TO "{names.old_table}"')
+        cursor.execute(f'ALTER TABLE "{names.new_table}" RENAME TO "{names.table}"')
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(%s)", [names.table]
+        )
+        for (partition,) in cursor.fetchall():
+            name = partition.strip('"').replace(names.new_table, names.table, 1)
+            cursor.execute(f'ALTER TABLE {partition} RENAME TO "{name}"')
+
+
+def drop_old(connection, model=BankAccount):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{Names(model).old_table}"')
+
+
+def abort(connection, model=BankAccount):
+    """
+    Undo a conversion that wasn't swapped: drop the trigger, the copy and
+    its sequence. Writes go to the current table alone again.
+    """
+    names = Names(model)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{names.trigger}" ON "{names.table}"')
+        cursor.execute(f'DROP FUNCTION IF EXISTS "{names.trigger}"()')
+        cursor.execute(f'DROP TABLE IF EXISTS "{names.new_table}"')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS "{names.sequence}"')
+
+
+def partition_bank_accounts(connection, partitions, batch_size=10000, progress=None, model=BankAccount):
+    """
+    Convert the BankAccount table to `partitions` hash partitions by
+    company_id. Does nothing if it is already partitioned, and resumes a
+    prepared conversion with the partitions it was prepared with.
+    """
+    if is_partitioned(connection, Names(model).table):
+        return False
+    if not is_prepared(connection, model):
+        prepare(connection, partitions, model)
+    backfill(connection, batch_size, progress, model)
+    swap(connection, model)
+    return True
@@ -0,0 +1,78 @@
+"""
+Cached phone number parsing.
+
+Every Company loaded from the database parses its phone number and every
+serialization formats it again. Both only depend on the stored string and
+the region, so results are memoized per process.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from phonenumber_field import modelfields, serializerfields
+from phonenumber_field.phonenumber import PhoneNumber, to_python
+from rest_framework import serializers
+
+CACHE_SIZE = 65536
+
+
+def _region(region):
+    return region or getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(value, region):
+    return to_python(value, region=region)
+
+
+def parse(value, region=None):
+    """
+    Same as phonenumber_field's `to_python`, memoized for strings.
+
+    A copy is returned so callers never share a mutable PhoneNumber.
+    """
+    if not isinstance(value, str) or not value:
+        return to_python(value, region=region)
+    cached = _parse(value, _region(region))
+    phone_number = PhoneNumber()
+    phone_number.merge_from(cached)
+    return phone_number
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _format(raw_input, region):
+    return str(_parse(raw_input, region))
+
+
+def format_phone(phone_number, region=None):
+    if phone_number.raw_input:
+        return _format(phone_number.raw_input, _region(region))
+    return str(phone_number)
+
+
+def to_e164(value, region=None):
+    """
+    E.164 form of a phone number in any format, or '' if it is not valid.
+    """
+    phone_number = parse(value, region)
+    if phone_number and phone_number.is_valid():
+        return phone_number.as_e164
+    return ''
+
+
+class CachedPhoneNumberDescriptor(modelfields.PhoneNumberDescriptor):
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.name] = parse(value, region=self.field.region)
+
+
+class CachedPhoneNumberField(modelfields.PhoneNumberField):
+    descriptor_class = CachedPhoneNumberDescriptor
+
+
+class CachedPhoneNumberSerializerField(serializerfields.PhoneNumberField):
+    def to_internal_value(self, data):
+        if not isinstance(data, PhoneNumber):
+            data = parse(serializers.CharField.to_internal_value(self, data), region=self.region)
+        return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        return format_phone(value, region=self.region)
@@ -0,0 +1,59 @@
+"""
+Compact renderers for the list endpoints, selected with the Accept header.
+
+`application/vnd.columnar+json` sends the field names once instead of once
+per row. `application/msgpack` is available when msgpack is installed.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer, BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    Render a list of objects as `{"columns": [...], "rows": [[...], ...]}`.
+
+    Anything else, e.g. an error, is rendered as plain JSON.
+    """
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+            columns = list(data[0]) if data else []
+            data = {'columns': columns, 'rows': [[row.get(column) for column in columns] for row in data]}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.default)
+
+    @staticmethod
+    def default(obj):
+        # Values msgpack can't pack (dates, decimals, uuids, lazy strings)
+        # as they would appear in JSON.
+        return json.loads(json.dumps(obj, cls=JSONEncoder))
+
+
+def list_renderer_classes(renderer_classes):
+    """
+    The default renderers plus the compact ones available in this process.
+    """
+    compact = [ColumnarJSONRenderer]
+    if msgpack is not None:
+        compact.append(MessagePackRenderer)
+    return [*renderer_classes, *compact]
@@ -1,19 +1,155 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models
 from rest_framework import serializers
-from .models import Company, Bank, BankAccount
+from . import banks
+from .jobs import HANDLERS
+from .models import Company, Bank, BankAccount, Change, Job
+from .phones import CachedPhoneNumberSerializerField
 
 
-class CompanySerializer(serializers.ModelSerializer):
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field whose existence check is deferred to the serializer.
+
+    BatchedRelationsMixin validates every such field of a serializer in a
+    single query instead of one query per field. Fields given a `lookup`
+    function, returning the related object for a primary key or None, are
+    checked with it instead, e.g. from a cache.
+    """
+
+    def __init__(self, lookup=None, **kwargs):
+        self.lookup = lookup
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BatchedRelationsMixin:
+    """
+    Check all BatchedPrimaryKeyRelatedField values with one UNION query.
+
+    Validated data holds the raw ids under the foreign key attname
+    (`bank_id`), so saving never loads the related rows.
+    """
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        lookups = [
+            (field, attrs[field.source])
+            for field in self.fields.values()
+            if isinstance(field, BatchedPrimaryKeyRelatedField) and field.source in attrs
+        ]
+        if not lookups:
+            return attrs
+
+        found = {field.source for field, pk in lookups if field.lookup is not None and field.lookup(pk) is not None}
+        querysets = [
+            field.get_queryset().filter(pk=pk).annotate(
+                relation=models.Value(field.source, output_field=models.CharField())
+            ).values_list('relation', flat=True)
+            for field, pk in lookups
+            if field.lookup is None
+        ]
+        if querysets:
+            found.update(querysets[0].union(*querysets[1:], all=True))
+
+        errors = {}
+        for field, pk in lookups:
+            if field.source not in found:
+                errors[field.field_name] = [field.error_messages['does_not_exist'].format(pk_value=pk)]
+            attrs[self.Meta.model._meta.get_field(field.source).attname] = attrs.pop(field.source)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class ChangedFieldsUpdateMixin:
+    """
+    Update only the columns whose value changed, skipping the save entirely
+    when nothing did.
+    """
+
+    def update(self, instance, validated_data):
+        changed = []
+        for attr, value in validated_data.items():
+            if instance._meta.get_field(attr).many_to_many:
+                getattr(instance, attr).set(value)
+            elif getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                changed.append(attr)
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
+
+
+class CompanySerializer(ChangedFieldsUpdateMixin, serializers.ModelSerializer):
+    phone = CachedPhoneNumberSerializerField()
+
     class Meta:
         model = Company
         fields = '__all__'
 
-class BankSerializer(serializers.ModelSerializer):
+class BankSerializer(ChangedFieldsUpdateMixin, serializers.ModelSerializer):
     class Meta:
         model = Bank
         fields = '__all__'
 
 
-class BankAccountSerializer(serializers.ModelSerializer):
+class BankAccountSerializer(BatchedRelationsMixin, ChangedFieldsUpdateMixin, serializers.ModelSerializer):
+    """
+    Banks are validated against and, with `?expand=bank`, expanded from the
+    in-memory bank cache.
+    """
+    bank = BatchedPrimaryKeyRelatedField(queryset=Bank.objects.all(), lookup=banks.get)
+    company = BatchedPrimaryKeyRelatedField(queryset=Company.objects.all())
+
     class Meta:
         model = BankAccount
         fields = '__all__'
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        if request is not None and 'bank' in request.query_params.get('expand', '').split(','):
+            # Shared by the rows of a list.
+            expanded = self.context.setdefault('expanded_banks', {})
+            if instance.bank_id not in expanded:
+                bank = banks.get(instance.bank_id)
+                expanded[instance.bank_id] = BankSerializer(bank).data if bank is not None else None
+            data['bank'] = expanded[instance.bank_id]
+        return data
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = '__all__'
+        read_only_fields = [
+            'status', 'progress', 'total', 'result', 'error', 'created_by', 'created_at', 'started_at', 'finished_at',
+            'heartbeat_at', 'attempts',
+        ]
+
+    def validate_kind(self, value):
+        if value not in HANDLERS:
+            raise serializers.ValidationError(f'Unknown job kind "{value}".')
+        return value
+
+
+class BatchIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=10000)
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Change
+        exclude = ('xid',)
+        # So the schema doesn't depend on the database's integer range.
+        extra_kwargs = {'object_id': {'min_value': None, 'max_value': None}}
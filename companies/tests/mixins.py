@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from companies import banks
+
+
+class TokenAuthMixin:
+    """
+    Creates the API user and token once per TestCase class.
+
+    Rows created in setUpTestData are shared by every test of the class and
+    rolled back at the end of each test, so subclasses should seed their
+    fixtures there too and keep setUp for plain values.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        super().setUp()
+        # The token is shared by the class, so reset its throttle counters.
+        cache.clear()
+        # Banks created by earlier tests were rolled back without signals.
+        banks.reset()
@@ -0,0 +1,102 @@
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+from companies import partitioning
+from companies.admin import EstimatedCountPaginator
+from companies.models import BankAccount
+from companies.tests.factories import BankAccountFactory, BankFactory, CompanyFactory
+
+
+class AdminChangelistQueriesTest(TestCase):
+    """ Test module for the number of queries per admin changelist page """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@test.com', 'test123')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def assertChangelistQueries(self, url, num, params=None):
+        if connection.vendor == 'postgresql' and not params:
+            # planner row estimate, below the threshold so it counts too
+            num += 1
+        with self.assertNumQueries(num):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_bank_account_changelist(self):
+        url = reverse('admin:companies_bankaccount_changelist')
+        BankAccountFactory.create_batch(3)
+        # session, user, count, bank filter choices, accounts with bank and company
+        self.assertChangelistQueries(url, 5)
+        BankAccountFactory.create_batch(20)
+        self.assertChangelistQueries(url, 5)
+
+    def test_company_changelist(self):
+        url = reverse('admin:companies_company_changelist')
+        CompanyFactory.create_batch(3)
+        # session, user, count, companies
+        self.assertChangelistQueries(url, 4)
+        CompanyFactory.create_batch(20)
+        self.assertChangelistQueries(url, 4)
+
+    def test_bank_changelist(self):
+        url = reverse('admin:companies_bank_changelist')
+        BankFactory.create_batch(20)
+        # session, user, count, banks
+        self.assertChangelistQueries(url, 4)
+
+    def test_company_search_by_phone(self):
+        company = CompanyFactory(phone='+55 48 99548-1447')
+        CompanyFactory(phone='+55 11 99999-0000')
+        response = self.assertChangelistQueries(
+            reverse('admin:companies_company_changelist'), 4, {'q': '(48) 99548-1447'}
+        )
+        self.assertEqual([row.pk for row in response.context['cl'].result_list], [company.pk])
+
+    def test_bank_account_change_form_does_not_load_relations(self):
+        account = BankAccountFactory()
+        # session, user, savepoint, account, content type, release,
+        # bank and company labels for the raw id widgets
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin:companies_bankaccount_change', args=[account.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row estimates come from the PostgreSQL planner.')
+@mock.patch('companies.admin.ESTIMATED_COUNT_THRESHOLD', 10)
+class EstimatedCountTest(TestCase):
+    """ Test module for the estimated changelist counts """
+
+    @classmethod
+    def setUpTestData(cls):
+        BankAccountFactory.create_batch(20)
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = %s::regclass",
+                [partitioning.TABLE],
+            )
+            for table in [row[0] for row in cursor.fetchall()] or [partitioning.TABLE]:
+                cursor.execute(f'ANALYZE {table}')
+
+    def assertEstimatedCount(self, count):
+        paginator = EstimatedCountPaginator(BankAccount.objects.order_by('pk'), 50)
+        # the estimate, no COUNT(*)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, count)
+
+    def test_table(self):
+        self.analyze()
+        self.assertEstimatedCount(20)
+
+    def test_partitioned_table(self):
+        partitioning.partition_bank_accounts(connection, 4)
+        self.analyze()
+        self.assertEstimatedCount(20)
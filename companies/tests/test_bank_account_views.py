@@ -2,23 +2,23 @@ import json
 from rest_framework import status
 from django.test import TestCase, Client
 from django.urls import reverse
+from companies import banks
 from companies.models import BankAccount
 from companies.serializers import BankAccountSerializer
 from companies.tests.factories import BankAccountFactory, BankFactory, CompanyFactory
-from rest_framework.authtoken.models import Token
-from django.contrib.auth.models import User
+from companies.tests.mixins import TokenAuthMixin
 
 
 client = Client()
 
 
-class GetAllBankAccountsTest(TestCase):
+class GetAllBankAccountsTest(TokenAuthMixin, TestCase):
     """ Test module for GET all Bank Account API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
         BankAccountFactory.create_batch(5)
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_get_all_bank_accounts(self):
         # get API response
@@ -33,14 +33,34 @@ class GetAllBankAccountsTest(TestCase):
         self.assertEqual(response.data, serializer.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_get_bank_accounts_of_company(self):
+        company = BankAccount.objects.first().company
+        BankAccountFactory.create_batch(2, company=company)
+        response = client.get(
+            reverse('bank_accounts_list'),
+            {'company': company.pk},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        serializer = BankAccountSerializer(BankAccount.objects.filter(company=company), many=True)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data, serializer.data)
+
+    def test_get_bank_accounts_of_invalid_company(self):
+        response = client.get(
+            reverse('bank_accounts_list'),
+            {'company': 'abc'},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
-class GetSingleBankAccountTest(TestCase):
+class GetSingleBankAccountTest(TokenAuthMixin, TestCase):
     """ Test module for GET single Bank Account API """
 
-    def setUp(self):
-        self.bank_account_1 = BankAccountFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_account_1 = BankAccountFactory()
 
     def test_get_valid_single_bank_account(self):
         response = client.get(
@@ -60,12 +80,17 @@ class GetSingleBankAccountTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class CreateNewBankAccountTest(TestCase):
+class CreateNewBankAccountTest(TokenAuthMixin, TestCase):
     """ Test module for inserting a new bank account """
 
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
+        cls.bank_1 = BankFactory()
+
     def setUp(self):
-        self.company_1 = CompanyFactory()
-        self.bank_1 = BankFactory()
+        super().setUp()
         self.valid_payload = {
             'bank': self.bank_1.pk,
             'company': self.company_1.pk,
@@ -76,8 +101,6 @@ class CreateNewBankAccountTest(TestCase):
             'name': '',
             'phone': '48995481447',
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_create_valid_bank_account(self):
         response = client.post(
@@ -102,12 +125,16 @@ class CreateNewBankAccountTest(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class UpdateSingleBankAccountTest(TestCase):
+class UpdateSingleBankAccountTest(TokenAuthMixin, TestCase):
     """ Test module for updating an existing bank account record """
 
-    def setUp(self):
-        self.bank_account_1 = BankAccountFactory()
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_account_1 = BankAccountFactory()
 
+    def setUp(self):
+        super().setUp()
         self.valid_payload = {
             'bank': self.bank_account_1.bank.pk,
             'company': self.bank_account_1.company.pk,
@@ -118,8 +145,6 @@ class UpdateSingleBankAccountTest(TestCase):
             'name': '',
             'phone': '48995481447',
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_valid_update_bank_account(self):
         response = client.put(
@@ -143,13 +168,13 @@ class UpdateSingleBankAccountTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class DeleteSingleBankAccountTest(TestCase):
+class DeleteSingleBankAccountTest(TokenAuthMixin, TestCase):
     """ Test module for deleting an existing bank account record """
 
-    def setUp(self):
-        self.bank_account_1 = BankAccountFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_account_1 = BankAccountFactory()
 
     def test_valid_delete_bank_account(self):
         response = client.delete(
@@ -164,3 +189,60 @@ class DeleteSingleBankAccountTest(TestCase):
             HTTP_AUTHORIZATION=f'Token {self.token.key}',
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BankAccountWriteQueriesTest(TokenAuthMixin, TestCase):
+    """ Test module for the number of queries issued by bank account writes """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_account_1 = BankAccountFactory()
+        cls.bank_2 = BankFactory()
+
+    def setUp(self):
+        super().setUp()
+        banks.get(self.bank_2.pk)
+        self.valid_payload = {
+            'bank': self.bank_2.pk,
+            'company': self.bank_account_1.company.pk,
+            'account_number': '102548758',
+            'agency': '0024',
+        }
+
+    def test_create_validates_relations_in_one_query(self):
+        # token, company, insert, change log
+        with self.assertNumQueries(4):
+            response = client.post(
+                reverse('bank_accounts_list'),
+                HTTP_AUTHORIZATION=f'Token {self.token.key}',
+                data=json.dumps(self.valid_payload),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update_writes_changed_columns_in_one_transaction(self):
+        # token, savepoint, locked row, company, update, change log, release
+        with self.assertNumQueries(7) as queries:
+            response = client.put(
+                reverse('bank_accounts_detail', kwargs={'pk': self.bank_account_1.pk}),
+                HTTP_AUTHORIZATION=f'Token {self.token.key}',
+                data=json.dumps(self.valid_payload),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE'))
+        self.assertNotIn('company_id', update)
+        self.assertEqual(BankAccount.objects.get().bank.id, self.bank_2.id)
+
+    def test_update_with_missing_relations(self):
+        self.valid_payload['bank'] = 999
+        self.valid_payload['company'] = 999
+        response = client.put(
+            reverse('bank_accounts_detail', kwargs={'pk': self.bank_account_1.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps(self.valid_payload),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(json.loads(response.content)), {'bank', 'company'})
@@ -0,0 +1,151 @@
+import json
+from unittest import mock
+from rest_framework import status
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from CompaniesAPI import routers
+from companies import banks
+from companies.models import Bank
+from companies.serializers import BankSerializer
+from companies.tests.factories import BankAccountFactory, BankFactory, CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+
+
+client = Client()
+
+
+def bank_queries(queries):
+    return [query for query in queries if 'FROM "companies_bank"' in query['sql']]
+
+
+class BankCacheTest(TestCase):
+    """ Test module for the in-memory bank cache """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bank_1 = BankFactory(code='001')
+        cls.bank_2 = BankFactory(code='002')
+
+    def setUp(self):
+        cache.clear()
+        banks.reset()
+
+    def test_banks_are_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(banks.get(self.bank_1.pk), self.bank_1)
+        with self.assertNumQueries(0):
+            self.assertEqual(banks.get_by_code('002'), self.bank_2)
+            self.assertIsNone(banks.get_by_code('999'))
+
+    def test_missing_bank_is_looked_up(self):
+        banks.get(self.bank_1.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNone(banks.get(999))
+        # e.g. created by another process whose version bump wasn't seen yet
+        bank_3, = Bank.objects.bulk_create([Bank(code='003', name='New')])
+        with self.assertNumQueries(2):
+            self.assertEqual(banks.get(bank_3.pk), bank_3)
+        self.assertEqual(banks.get_by_code('003'), bank_3)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    def test_banks_are_loaded_from_primary_during_replica_requests(self):
+        routers.start_request()
+        try:
+            routers.use_replica()
+            self.assertEqual(banks.get(self.bank_1.pk), self.bank_1)
+            self.assertIsNone(banks.get(999))
+        finally:
+            used = routers.end_request()
+        self.assertEqual(used, set())
+
+    def test_saving_a_bank_reloads(self):
+        banks.get(self.bank_1.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            bank_3 = BankFactory(code='003')
+        self.assertEqual(banks.get_by_code('003'), bank_3)
+        with self.captureOnCommitCallbacks(execute=True):
+            bank_3.delete()
+        self.assertIsNone(banks.get_by_code('003'))
+
+    def test_saving_a_bank_changes_the_shared_version(self):
+        banks.get(self.bank_1.pk)
+        version = cache.get(banks.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bank_1.save()
+        self.assertNotEqual(cache.get(banks.VERSION_KEY), version)
+
+    @override_settings(BANK_CACHE_CHECK_SECONDS=0)
+    def test_process_local_cache_reloads_every_interval(self):
+        banks.get(self.bank_1.pk)
+        Bank.objects.filter(pk=self.bank_1.pk).update(name='Renamed')
+        with self.assertNumQueries(1):
+            self.assertEqual(banks.get(self.bank_1.pk).name, 'Renamed')
+
+    @override_settings(BANK_CACHE_CHECK_SECONDS=0)
+    @mock.patch('companies.banks.LOCAL_BACKENDS', ())
+    def test_change_in_another_process_reloads(self):
+        banks.get(self.bank_1.pk)
+        Bank.objects.filter(pk=self.bank_1.pk).update(name='Renamed')
+        cache.set(banks.VERSION_KEY, 'changed elsewhere')
+        with self.assertNumQueries(1):
+            self.assertEqual(banks.get(self.bank_1.pk).name, 'Renamed')
+
+    @override_settings(BANK_CACHE_CHECK_SECONDS=0)
+    @mock.patch('companies.banks.LOCAL_BACKENDS', ())
+    def test_unchanged_version_does_not_reload(self):
+        banks.get(self.bank_1.pk)
+        with self.assertNumQueries(0):
+            banks.get(self.bank_1.pk)
+
+    @override_settings(BANK_CACHE_CHECK_SECONDS=60)
+    @mock.patch('companies.banks.LOCAL_BACKENDS', ())
+    def test_version_is_checked_at_most_every_interval(self):
+        banks.get(self.bank_1.pk)
+        cache.set(banks.VERSION_KEY, 'changed elsewhere')
+        with self.assertNumQueries(0):
+            banks.get(self.bank_1.pk)
+
+
+class BankAccountBankCacheTest(TokenAuthMixin, TestCase):
+    """ Test module for bank account validation and expansion from the bank cache """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank = BankFactory()
+        cls.company = CompanyFactory()
+        BankAccountFactory.create_batch(3, bank=cls.bank, company=cls.company)
+
+    def setUp(self):
+        super().setUp()
+        banks.get(self.bank.pk)
+
+    def create(self, bank):
+        return client.post(
+            reverse('bank_accounts_list'),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps({'bank': bank, 'company': self.company.pk, 'account_number': '1', 'agency': '1'}),
+            content_type='application/json'
+        )
+
+    def test_create_does_not_query_banks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.create(self.bank.pk)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(bank_queries(queries), [])
+
+    def test_create_with_missing_bank(self):
+        response = self.create(999)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(json.loads(response.content)), {'bank'})
+
+    def test_expand_bank(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(
+                reverse('bank_accounts_list'), {'expand': 'bank'}, HTTP_AUTHORIZATION=f'Token {self.token.key}'
+            )
+        self.assertEqual(bank_queries(queries), [])
+        self.assertEqual([account['bank'] for account in response.data], [BankSerializer(self.bank).data] * 3)
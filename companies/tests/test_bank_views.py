@@ -5,20 +5,19 @@ from django.urls import reverse
 from companies.models import Bank
 from companies.serializers import BankSerializer
 from companies.tests.factories import BankFactory
-from rest_framework.authtoken.models import Token
-from django.contrib.auth.models import User
+from companies.tests.mixins import TokenAuthMixin
 
 
 client = Client()
 
 
-class GetAllBanksTest(TestCase):
+class GetAllBanksTest(TokenAuthMixin, TestCase):
     """ Test module for GET all Banks API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
         BankFactory.create_batch(5)
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_get_all_banks(self):
         # get API response
@@ -34,13 +33,13 @@ class GetAllBanksTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
-class GetSingleBanksTest(TestCase):
+class GetSingleBanksTest(TokenAuthMixin, TestCase):
     """ Test module for GET single Banks API """
 
-    def setUp(self):
-        self.bank_1 = BankFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_1 = BankFactory()
 
     def test_get_valid_single_bank(self):
         response = client.get(
@@ -60,10 +59,11 @@ class GetSingleBanksTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class CreateNewBankTest(TestCase):
+class CreateNewBankTest(TokenAuthMixin, TestCase):
     """ Test module for inserting a new bank """
 
     def setUp(self):
+        super().setUp()
         self.valid_payload = {
             'name': 'Copper Wire',
             'code': '002',
@@ -72,8 +72,6 @@ class CreateNewBankTest(TestCase):
             'name': '',
             'phone': '48995481447',
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_create_valid_bank(self):
         response = client.post(
@@ -96,12 +94,16 @@ class CreateNewBankTest(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
-class UpdateSinglebankTest(TestCase):
+class UpdateSinglebankTest(TokenAuthMixin, TestCase):
     """ Test module for updating an existing bank record """
 
-    def setUp(self):
-        self.bank_1 = BankFactory()
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_1 = BankFactory()
 
+    def setUp(self):
+        super().setUp()
         self.valid_payload = {
             'name': 'Copper Wire',
             'code': '002',
@@ -110,8 +112,6 @@ class UpdateSinglebankTest(TestCase):
             'name': '',
             'phone': '48995481447',
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_valid_update_bank(self):
         response = client.put(
@@ -131,13 +131,13 @@ class UpdateSinglebankTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class DeleteSinglebankTest(TestCase):
+class DeleteSinglebankTest(TokenAuthMixin, TestCase):
     """ Test module for deleting an existing bank record """
 
-    def setUp(self):
-        self.bank_1 = BankFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bank_1 = BankFactory()
 
     def test_valid_delete_bank(self):
         response = client.delete(
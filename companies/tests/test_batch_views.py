@@ -0,0 +1,87 @@
+import json
+from rest_framework import status
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from companies.models import Company, Bank, BankAccount
+from companies.serializers import CompanySerializer, BankSerializer, BankAccountSerializer
+from companies.tests.factories import BankAccountFactory
+from companies.tests.mixins import TokenAuthMixin
+
+
+client = Client()
+
+
+class BatchGetTest(TokenAuthMixin, TestCase):
+    """ Test module for getting companies, banks and bank accounts by ids """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        BankAccountFactory.create_batch(5)
+
+    def get(self, name, ids):
+        return client.get(reverse(name), {'ids': ids}, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def post(self, name, data):
+        return client.post(
+            reverse(name),
+            data=json.dumps(data),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    def test_get_by_ids_in_request_order(self):
+        for name, model, serializer_class in (
+            ('company_list', Company, CompanySerializer),
+            ('bank_list', Bank, BankSerializer),
+            ('bank_accounts_list', BankAccount, BankAccountSerializer),
+        ):
+            with self.subTest(name=name):
+                ids = list(model.objects.order_by('-pk').values_list('pk', flat=True)[:3])
+                response = self.get(name, ','.join(map(str, ids)))
+                expected = [serializer_class(model.objects.get(pk=pk)).data for pk in ids]
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.data, {'results': expected, 'missing': []})
+
+    def test_missing_ids_are_reported(self):
+        company = Company.objects.first()
+        missing = Company.objects.order_by('pk').last().pk + 1
+        response = self.get('company_list', f'{missing},{company.pk},{company.pk}')
+        self.assertEqual([result['id'] for result in response.data['results']], [company.pk])
+        self.assertEqual(response.data['missing'], [missing])
+
+    def test_get_by_ids_in_one_query(self):
+        ids = ','.join(str(pk) for pk in BankAccount.objects.values_list('pk', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            self.get('bank_accounts_list', ids)
+        account_queries = [query for query in queries if 'companies_bankaccount' in query['sql']]
+        self.assertEqual(len(account_queries), 1)
+
+    def test_invalid_ids(self):
+        for ids in ('', '1,abc', '0'):
+            with self.subTest(ids=ids):
+                response = self.get('company_list', ids)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('ids', response.data)
+
+    def test_post_ids(self):
+        ids = list(Bank.objects.order_by('-pk').values_list('pk', flat=True)) + [10 ** 9]
+        response = self.post('bank_batch', {'ids': ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['id'] for result in response.data['results']], ids[:-1])
+        self.assertEqual(response.data['missing'], [10 ** 9])
+
+    def test_post_invalid_ids(self):
+        for data in ({}, {'ids': []}, {'ids': ['a']}, [1, 2], {'ids': list(range(1, 10002))}):
+            with self.subTest(data=str(data)[:20]):
+                response = self.post('company_batch', data)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_post_does_not_create(self):
+        response = self.post('bank_accounts_batch', {'ids': [1]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(BankAccount.objects.count(), 5)
+        response = client.get(reverse('company_batch'), HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,180 @@
+import json
+import threading
+from unittest import skipUnless
+from rest_framework import status
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from companies.jobs import run_pending
+from companies.models import Bank, Change, Job
+from companies.tests.factories import BankAccountFactory, BankFactory, CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+
+
+client = Client()
+
+
+class ChangeFeedTest(TokenAuthMixin, TestCase):
+    """ Test module for the change feed """
+
+    def get(self, **params):
+        return client.get(reverse('change_list'), params, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def changes(self, since=0):
+        return [
+            (change['model'], change['object_id'], change['action'])
+            for change in self.get(since=since).data['results']
+        ]
+
+    def test_creates_and_updates_are_recorded(self):
+        bank = BankFactory()
+        bank.name = 'Copper Wire'
+        bank.save()
+        self.assertEqual(self.changes(), [('bank', bank.pk, 'created'), ('bank', bank.pk, 'updated')])
+        self.assertEqual(self.get().data['results'][1]['data']['name'], 'Copper Wire')
+
+    def test_api_writes_are_recorded(self):
+        bank = BankFactory()
+        cursor = self.get().data['cursor']
+        response = client.patch(
+            reverse('bank_detail', kwargs={'pk': bank.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps({'name': 'Copper Wire'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.changes(cursor), [('bank', bank.pk, 'updated')])
+
+    def test_bank_account_delete_leaves_tombstone(self):
+        bank_account = BankAccountFactory()
+        cursor = self.get().data['cursor']
+        client.delete(
+            reverse('bank_accounts_detail', kwargs={'pk': bank_account.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+        response = self.get(since=cursor)
+        self.assertEqual(response.data['results'][0]['action'], Change.DELETED)
+        self.assertIsNone(response.data['results'][0]['data'])
+
+    def test_cascading_deletes_leave_tombstones(self):
+        company = CompanyFactory()
+        bank_accounts = BankAccountFactory.create_batch(3, company=company)
+        cursor = self.get().data['cursor']
+        company_id = company.pk
+        company.delete()
+        self.assertCountEqual(
+            self.changes(cursor),
+            [('bank_account', bank_account.pk, 'deleted') for bank_account in bank_accounts]
+            + [('company', company_id, 'deleted')]
+        )
+
+        bank_account = BankAccountFactory()
+        cursor = self.get().data['cursor']
+        Bank.objects.filter(pk=bank_account.bank_id).delete()
+        self.assertCountEqual(
+            self.changes(cursor),
+            [('bank_account', bank_account.pk, 'deleted'), ('bank', bank_account.bank_id, 'deleted')]
+        )
+
+    def test_background_company_delete_leaves_tombstones(self):
+        company = CompanyFactory()
+        bank_accounts = BankAccountFactory.create_batch(2, company=company)
+        cursor = self.get().data['cursor']
+        client.delete(
+            reverse('company_detail', kwargs={'pk': company.pk}) + '?async=true',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+        run_pending()
+        self.assertCountEqual(
+            self.changes(cursor),
+            [('bank_account', bank_account.pk, 'deleted') for bank_account in bank_accounts]
+            + [('company', company.pk, 'deleted')]
+        )
+
+    def test_pages_with_cursor(self):
+        BankFactory.create_batch(5)
+        response = self.get(limit=3)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertTrue(response.data['has_more'])
+        response = self.get(since=response.data['cursor'], limit=3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertFalse(response.data['has_more'])
+        cursor = response.data['cursor']
+        response = self.get(since=cursor)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['cursor'], cursor)
+
+    def test_invalid_cursor(self):
+        response = self.get(since='abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_plain_id_cursor(self):
+        banks = BankFactory.create_batch(2)
+        Change.objects.update(xid=0)
+        first = Change.objects.order_by('id').first()
+        self.assertEqual(self.changes(since=first.id), [('bank', banks[1].pk, 'created')])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Other databases commit writes in id order.')
+class ChangeFeedCommitOrderTest(TransactionTestCase):
+    """ Test module for changes committed out of id order """
+
+    def setUp(self):
+        self.token = Token.objects.create(user=User.objects.create_user('test_user', 'test@test.com', 'test123'))
+        self.written, self.commit = threading.Event(), threading.Event()
+        self.slow = []
+
+    def get(self, since):
+        response = client.get(reverse('change_list'), {'since': since}, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return [change['object_id'] for change in response.data['results']], response.data['cursor']
+
+    def slow_transaction(self):
+        try:
+            with transaction.atomic():
+                self.slow.append(BankFactory())
+                self.written.set()
+                self.commit.wait()
+        finally:
+            connection.close()
+
+    def test_changes_after_a_transaction_in_progress_are_held_back(self):
+        thread = threading.Thread(target=self.slow_transaction)
+        thread.start()
+        self.written.wait()
+        fast = BankFactory()
+
+        changes, cursor = self.get(0)
+        self.assertEqual(changes, [])
+        self.commit.set()
+        thread.join()
+        changes, cursor = self.get(cursor)
+        self.assertEqual(changes, [self.slow[0].pk, fast.pk])
+
+    def test_transactions_without_changes_are_not_waited_for(self):
+        started, write = threading.Event(), threading.Event()
+        late = []
+
+        def late_writer():
+            try:
+                with transaction.atomic():
+                    # Has a transaction id, but no change yet.
+                    Job.objects.create(kind='noop')
+                    started.set()
+                    write.wait()
+                    late.append(BankFactory())
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=late_writer)
+        thread.start()
+        started.wait()
+        fast = BankFactory()
+
+        changes, cursor = self.get(0)
+        self.assertEqual(changes, [fast.pk])
+        write.set()
+        thread.join()
+        changes, cursor = self.get(cursor)
+        self.assertEqual(changes, [late[0].pk])
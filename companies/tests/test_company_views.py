@@ -1,24 +1,25 @@
 import json
+from unittest import mock
 from rest_framework import status
 from django.test import TestCase, Client
 from django.urls import reverse
-from companies.models import Company
+from companies.jobs import run_pending
+from companies.models import Company, BankAccount
 from companies.serializers import CompanySerializer
-from companies.tests.factories import CompanyFactory
-from rest_framework.authtoken.models import Token
-from django.contrib.auth.models import User
+from companies.tests.factories import CompanyFactory, BankAccountFactory
+from companies.tests.mixins import TokenAuthMixin
 
 
 client = Client()
 
 
-class GetAllCompaniesTest(TestCase):
+class GetAllCompaniesTest(TokenAuthMixin, TestCase):
     """ Test module for GET all Companies API """
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
         CompanyFactory.create_batch(5)
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_get_all_companies(self):
         # get API response
@@ -34,13 +35,13 @@ class GetAllCompaniesTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
-class GetSingleCompaniesTest(TestCase):
+class GetSingleCompaniesTest(TokenAuthMixin, TestCase):
     """ Test module for GET single Companies API """
 
-    def setUp(self):
-        self.company_1 = CompanyFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
 
     def test_get_valid_single_company(self):
         response = client.get(
@@ -60,10 +61,11 @@ class GetSingleCompaniesTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
-class CreateNewCompanyTest(TestCase):
+class CreateNewCompanyTest(TokenAuthMixin, TestCase):
     """ Test module for inserting a new Company """
 
     def setUp(self):
+        super().setUp()
         self.valid_payload = {
             'name': 'Copper Wire',
             'phone': '48995481447',
@@ -83,8 +85,6 @@ class CreateNewCompanyTest(TestCase):
             'address': 'address test',
             'earnings_declared': 1,
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_create_valid_company(self):
         response = client.post(
@@ -124,12 +124,16 @@ class CreateNewCompanyTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class UpdateSingleCompanyTest(TestCase):
+class UpdateSingleCompanyTest(TokenAuthMixin, TestCase):
     """ Test module for updating an existing Company record """
 
-    def setUp(self):
-        self.company_1 = CompanyFactory()
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
 
+    def setUp(self):
+        super().setUp()
         self.valid_payload = {
             'name': 'Copper Wire',
             'phone': '48995481447',
@@ -143,8 +147,6 @@ class UpdateSingleCompanyTest(TestCase):
             'name': '',
             'phone': 'SADF2',
         }
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
 
     def test_valid_update_company(self):
         response = client.put(
@@ -164,13 +166,13 @@ class UpdateSingleCompanyTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
-class DeleteSingleCompanyTest(TestCase):
+class DeleteSingleCompanyTest(TokenAuthMixin, TestCase):
     """ Test module for deleting an existing Company record """
 
-    def setUp(self):
-        self.company_1 = CompanyFactory()
-        self.user = User.objects.create_user('test_user', 'test@test.com', 'test123')
-        self.token = Token.objects.create(user=self.user)
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
 
     def test_valid_delete_company(self):
         response = client.delete(
@@ -185,3 +187,131 @@ class DeleteSingleCompanyTest(TestCase):
             HTTP_AUTHORIZATION=f'Token {self.token.key}',
         )
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CompanyWriteQueriesTest(TokenAuthMixin, TestCase):
+    """ Test module for the number of queries issued by Company updates """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
+
+    def patch(self, payload):
+        return client.patch(
+            reverse('company_detail', kwargs={'pk': self.company_1.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+    def test_partial_update_writes_changed_columns(self):
+        # token, savepoint, locked row, update, change log, bank_accounts, release
+        with self.assertNumQueries(7) as queries:
+            response = self.patch({'name': 'Copper Wire'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        update = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE'))
+        self.assertNotIn('address', update)
+        self.assertEqual(Company.objects.get().name, 'Copper Wire')
+
+    def test_unchanged_update_skips_write(self):
+        # token, savepoint, locked row, bank_accounts, release
+        with self.assertNumQueries(5):
+            response = self.patch({'name': self.company_1.name})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class DeleteCompanyWithBankAccountsTest(TokenAuthMixin, TestCase):
+    """ Test module for deleting a Company with bank accounts """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
+        BankAccountFactory.create_batch(5, company=cls.company_1)
+        BankAccountFactory()
+
+    def delete(self, query=''):
+        return client.delete(
+            reverse('company_detail', kwargs={'pk': self.company_1.pk}) + query,
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+
+    def test_bank_accounts_are_deleted_without_loading_them(self):
+        # token, company, account tombstones, bank accounts, company delete,
+        # company tombstone
+        with self.assertNumQueries(6) as queries:
+            response = self.delete()
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        account_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('SELECT', 'DELETE')) and 'companies_bankaccount' in query['sql']
+        ]
+        self.assertEqual(len(account_queries), 1)
+        self.assertTrue(account_queries[0].startswith('DELETE'))
+        self.assertEqual(BankAccount.objects.count(), 1)
+
+    @mock.patch('companies.deletion.DELETE_BATCH_SIZE', 2)
+    def test_async_delete(self):
+        response = self.delete('?async=true')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertTrue(Company.objects.filter(pk=self.company_1.pk).exists())
+
+        run_pending()
+        response = client.get(response['Location'], HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['progress'], 5)
+        self.assertEqual(response.data['total'], 5)
+        self.assertFalse(Company.objects.filter(pk=self.company_1.pk).exists())
+        self.assertEqual(BankAccount.objects.count(), 1)
+
+    def test_async_delete_of_missing_company(self):
+        response = client.delete(
+            reverse('company_detail', kwargs={'pk': 30}) + '?async=true',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CompanyPhoneLookupTest(TokenAuthMixin, TestCase):
+    """ Test module for finding Companies by phone number """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory(phone='+55 48 99548-1447')
+        CompanyFactory(phone='+55 11 99999-0000')
+
+    def get(self, phone):
+        return client.get(
+            reverse('company_list'),
+            {'phone': phone},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    def test_phone_is_normalized_on_save(self):
+        self.assertEqual(Company.objects.get(pk=self.company_1.pk).phone_e164, '+5548995481447')
+
+    def test_lookup_accepts_any_format(self):
+        for phone in ['48995481447', '(48) 99548-1447', '+5548995481447', '+55 48 99548 1447']:
+            response = self.get(phone)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([company['id'] for company in response.data], [self.company_1.pk])
+
+    def test_lookup_with_invalid_phone(self):
+        response = self.get('test')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_partial_update_renormalizes_phone(self):
+        response = client.patch(
+            reverse('company_detail', kwargs={'pk': self.company_1.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps({'phone': '11988887777'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['phone'], '+5511988887777')
+        self.assertEqual(Company.objects.get(pk=self.company_1.pk).phone_e164, '+5511988887777')
+        self.assertEqual(self.get('11988887777').data[0]['id'], self.company_1.pk)
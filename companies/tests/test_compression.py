@@ -0,0 +1,110 @@
+import gzip
+import json
+import brotli
+import msgpack
+import zstandard
+from rest_framework import status
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from companies.models import Company
+from companies.serializers import CompanySerializer
+from companies.tests.factories import BankAccountFactory, CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+from CompaniesAPI.middleware import choose_encoding
+
+
+client = Client()
+
+
+class ChooseEncodingTest(TestCase):
+    """ Test module for Accept-Encoding negotiation """
+
+    def test_prefers_zstd_then_brotli_then_gzip(self):
+        self.assertEqual(choose_encoding('gzip, br, zstd')[0], 'zstd')
+        self.assertEqual(choose_encoding('gzip, br')[0], 'br')
+        self.assertEqual(choose_encoding('gzip, deflate')[0], 'gzip')
+
+    def test_client_quality_wins(self):
+        self.assertEqual(choose_encoding('zstd;q=0.5, gzip')[0], 'gzip')
+        self.assertEqual(choose_encoding('*, zstd;q=0')[0], 'br')
+
+    def test_no_supported_encoding(self):
+        self.assertIsNone(choose_encoding('')[0])
+        self.assertIsNone(choose_encoding('deflate, identity')[0])
+        self.assertIsNone(choose_encoding('gzip;q=0')[0])
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressedListTest(TokenAuthMixin, TestCase):
+    """ Test module for compressed and compact list responses """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        BankAccountFactory.create_batch(20)
+
+    def get(self, name='company_list', **headers):
+        return client.get(reverse(name), HTTP_AUTHORIZATION=f'Token {self.token.key}', **headers)
+
+    def expected(self):
+        companies = Company.objects.prefetch_related('bank_accounts')
+        return json.loads(json.dumps(CompanySerializer(companies, many=True).data))
+
+    def test_uncompressed_without_accept_encoding(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response.json(), self.expected())
+
+    def test_compressed_responses(self):
+        decompress = {
+            'gzip': gzip.decompress,
+            'br': brotli.decompress,
+            'zstd': zstandard.ZstdDecompressor().decompress,
+        }
+        for coding, decompress in decompress.items():
+            with self.subTest(coding=coding):
+                response = self.get(HTTP_ACCEPT_ENCODING=coding)
+                self.assertEqual(response['Content-Encoding'], coding)
+                self.assertEqual(int(response['Content-Length']), len(response.content))
+                self.assertEqual(json.loads(decompress(response.content)), self.expected())
+
+    def test_small_responses_are_not_compressed(self):
+        with self.settings(COMPRESSION_MIN_SIZE=10 ** 9):
+            response = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_columnar_json(self):
+        response = self.get(HTTP_ACCEPT='application/vnd.columnar+json')
+        self.assertEqual(response['Content-Type'], 'application/vnd.columnar+json')
+        data = json.loads(response.content)
+        expected = self.expected()
+        self.assertEqual(data['columns'], list(expected[0]))
+        self.assertEqual([dict(zip(data['columns'], row)) for row in data['rows']], expected)
+
+    def test_columnar_json_empty_list(self):
+        Company.objects.all().delete()
+        response = self.get(HTTP_ACCEPT='application/vnd.columnar+json')
+        self.assertEqual(json.loads(response.content), {'columns': [], 'rows': []})
+
+    def test_msgpack(self):
+        for name in ('company_list', 'bank_list', 'bank_accounts_list'):
+            with self.subTest(name=name):
+                response = self.get(name, HTTP_ACCEPT='application/msgpack')
+                self.assertEqual(response['Content-Type'], 'application/msgpack')
+                self.assertEqual(msgpack.unpackb(response.content), self.get(name).json())
+
+    def test_msgpack_error(self):
+        response = client.get(reverse('company_list'), HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('detail', msgpack.unpackb(response.content))
+
+    def test_detail_does_not_offer_compact_formats(self):
+        company = CompanyFactory()
+        response = client.get(
+            reverse('company_detail', kwargs={'pk': company.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
@@ -0,0 +1,95 @@
+from unittest import mock
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, RequestFactory, override_settings
+from django.views import View
+from CompaniesAPI.middleware import ReplicaRoutingMiddleware
+from CompaniesAPI.routers import ReplicaRouter
+from companies.models import Company
+
+
+factory = RequestFactory()
+
+
+class ReplicaView(View):
+    read_from_replica = True
+
+
+class PrimaryView(View):
+    pass
+
+
+class ReadOnlyPostView(View):
+    read_from_replica = True
+    read_only_methods = ('POST',)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTest(TestCase):
+    """ Test module for read replica routing """
+
+    def setUp(self):
+        cache.clear()
+
+    def route(self, request, view_class=ReplicaView, view=None):
+        """ Run the request through the middleware and return the read alias seen by the view """
+        seen = {}
+
+        def get_response(request):
+            middleware.process_view(request, view_class.as_view(), (), {})
+            if view is not None:
+                view()
+            seen['alias'] = ReplicaRouter().db_for_read(Company)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return seen['alias']
+
+    def test_safe_request_reads_from_replica(self):
+        request = factory.get('/', HTTP_AUTHORIZATION='Token a')
+        self.assertEqual(self.route(request), 'replica_0')
+
+    def test_views_without_flag_read_from_primary(self):
+        request = factory.get('/', HTTP_AUTHORIZATION='Token a')
+        self.assertEqual(self.route(request, PrimaryView), 'default')
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_write(Company), 'default')
+        request = factory.post('/', HTTP_AUTHORIZATION='Token a')
+        self.assertEqual(self.route(request), 'default')
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        self.route(factory.post('/', HTTP_AUTHORIZATION='Token a'))
+        self.assertEqual(self.route(factory.get('/', HTTP_AUTHORIZATION='Token a')), 'default')
+        self.assertEqual(self.route(factory.get('/', HTTP_AUTHORIZATION='Token b')), 'replica_0')
+
+    def test_client_is_pinned_for_the_whole_window_after_a_slow_write(self):
+        now = [1000.0]
+
+        def slow_write():
+            now[0] += 60
+
+        with mock.patch('time.time', lambda: now[0]):
+            self.route(factory.post('/', HTTP_AUTHORIZATION='Token a'), view=slow_write)
+            now[0] += 4
+            self.assertEqual(self.route(factory.get('/', HTTP_AUTHORIZATION='Token a')), 'default')
+
+    def test_read_only_post_reads_from_replica(self):
+        request = factory.post('/', HTTP_AUTHORIZATION='Token a')
+        self.assertEqual(self.route(request, ReadOnlyPostView), 'replica_0')
+        self.assertEqual(self.route(factory.get('/', HTTP_AUTHORIZATION='Token a')), 'replica_0')
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(ReplicaRouter().db_for_read(Company), 'default')
+
+    def test_traffic_is_counted(self):
+        self.route(factory.get('/', HTTP_AUTHORIZATION='Token a'))
+        self.route(factory.get('/', HTTP_AUTHORIZATION='Token a'), PrimaryView)
+        self.route(factory.get('/', HTTP_AUTHORIZATION='Token b'))
+        self.assertEqual(cache.get('db_route_replica'), 2)
+        self.assertEqual(cache.get('db_route_primary'), 1)
+
+    def test_only_primary_is_migrated(self):
+        self.assertTrue(ReplicaRouter().allow_migrate('default', 'companies'))
+        self.assertFalse(ReplicaRouter().allow_migrate('replica_0', 'companies'))
@@ -0,0 +1,182 @@
+import json
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from companies.models import BankAccount, Company, IdempotencyKey
+from companies.tests.factories import BankFactory, CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+from companies.views import CompanyList
+from CompaniesAPI.querybudget import QueryBudgetExceeded
+
+
+client = Client()
+
+COMPANY = {
+    'name': 'Idempotent company',
+    'phone': '+5548995481447',
+    'address': 'Rua A, 100',
+    'city': 'Florianopolis',
+    'state': 'SC',
+    'country': 'Brazil',
+    'earnings_declared': '1000.0000',
+}
+
+
+class IdempotencyKeyTest(TokenAuthMixin, TestCase):
+    """ Test module for writes with an Idempotency-Key header """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company = CompanyFactory()
+        cls.bank = BankFactory()
+
+    def post(self, url, payload, key='key-1', token=None):
+        return client.post(
+            url,
+            HTTP_AUTHORIZATION=f'Token {(token or self.token).key}',
+            HTTP_IDEMPOTENCY_KEY=key,
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+    def test_retried_create_is_replayed(self):
+        response = self.post(reverse('company_list'), COMPANY)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        # token, savepoint, key insert, locked key, release
+        with self.assertNumQueries(5):
+            replay = self.post(reverse('company_list'), COMPANY)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(replay.content), json.loads(response.content))
+        self.assertEqual(Company.objects.filter(name=COMPANY['name']).count(), 1)
+
+    def test_only_keyed_writes_get_the_key_queries(self):
+        # The keyless budget of creates, which a keyed create exceeds by the
+        # 3 queries of its key unless they are allowed.
+        with mock.patch.object(CompanyList, 'query_budget', {'POST': 4}):
+            with mock.patch('companies.views.allow_queries'), self.assertRaises(QueryBudgetExceeded):
+                self.post(reverse('company_list'), COMPANY, key='not-allowed')
+            self.assertEqual(self.post(reverse('company_list'), COMPANY).status_code, status.HTTP_201_CREATED)
+
+    def test_retried_bank_account_create_is_replayed(self):
+        payload = {'bank': self.bank.pk, 'company': self.company.pk, 'account_number': '1', 'agency': '1'}
+        for _ in range(2):
+            response = self.post(reverse('bank_accounts_list'), payload)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BankAccount.objects.count(), 1)
+
+    def test_retried_update_is_replayed(self):
+        url = reverse('company_detail', kwargs={'pk': self.company.pk})
+        response = client.patch(
+            url, HTTP_AUTHORIZATION=f'Token {self.token.key}', HTTP_IDEMPOTENCY_KEY='update',
+            data=json.dumps({'name': 'Renamed'}), content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Company.objects.filter(pk=self.company.pk).update(name='Changed since')
+        replay = client.patch(
+            url, HTTP_AUTHORIZATION=f'Token {self.token.key}', HTTP_IDEMPOTENCY_KEY='update',
+            data=json.dumps({'name': 'Renamed'}), content_type='application/json'
+        )
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data['name'], 'Renamed')
+        self.assertEqual(Company.objects.get(pk=self.company.pk).name, 'Changed since')
+
+    def test_key_reused_for_another_request(self):
+        self.post(reverse('company_list'), COMPANY)
+        response = self.post(reverse('company_list'), {**COMPANY, 'name': 'Another company'})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Company.objects.filter(name='Another company').count(), 0)
+
+    def test_keys_are_per_user(self):
+        other = User.objects.create_user('other_user', 'other@test.com', 'test123')
+        self.post(reverse('company_list'), COMPANY)
+        response = self.post(reverse('company_list'), COMPANY, token=Token.objects.create(user=other))
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Company.objects.filter(name=COMPANY['name']).count(), 2)
+
+    def test_failed_write_can_be_retried(self):
+        response = self.post(reverse('company_list'), {**COMPANY, 'phone': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post(reverse('company_list'), COMPANY).status_code, status.HTTP_201_CREATED)
+
+    def test_expired_key_writes_again(self):
+        self.post(reverse('company_list'), COMPANY)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        response = self.post(reverse('company_list'), {**COMPANY, 'name': 'Another company'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertGreater(IdempotencyKey.objects.get().expires_at, timezone.now())
+
+    def test_key_too_long(self):
+        response = self.post(reverse('company_list'), COMPANY, key='k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Idempotency-Key', json.loads(response.content))
+
+    def test_purge_expired_keys(self):
+        self.post(reverse('company_list'), COMPANY, key='expired')
+        self.post(reverse('company_list'), {**COMPANY, 'name': 'Another company'}, key='live')
+        IdempotencyKey.objects.filter(key='expired').update(expires_at=timezone.now() - timedelta(seconds=1))
+        output = StringIO()
+        call_command('purge_idempotency_keys', batch_size=1, stdout=output)
+        self.assertIn('deleted 1 ', output.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['live'])
+
+    def test_purge_keeps_keys_claimed_after_they_were_picked(self):
+        self.post(reverse('company_list'), COMPANY, key='reclaimed')
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        delete = QuerySet.delete
+
+        def claim_then_delete(queryset):
+            # A new request with the key reuses the expired row meanwhile.
+            IdempotencyKey.objects.update(expires_at=timezone.now() + timedelta(days=1))
+            return delete(queryset)
+
+        with mock.patch.object(QuerySet, 'delete', claim_then_delete):
+            call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertTrue(IdempotencyKey.objects.filter(key='reclaimed').exists())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrent writes need row locks.')
+class ConcurrentIdempotencyKeyTest(TransactionTestCase):
+    """ Test module for concurrent duplicates of a write with an Idempotency-Key """
+
+    def test_concurrent_duplicates_write_once(self):
+        token = Token.objects.create(user=User.objects.create_user('test_user', 'test@test.com', 'test123'))
+        barrier = threading.Barrier(4)
+        responses = []
+
+        def post():
+            barrier.wait()
+            try:
+                responses.append(Client().post(
+                    reverse('company_list'),
+                    HTTP_AUTHORIZATION=f'Token {token.key}',
+                    HTTP_IDEMPOTENCY_KEY='concurrent',
+                    data=json.dumps(COMPANY),
+                    content_type='application/json'
+                ))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_201_CREATED] * 4)
+        self.assertEqual(sum(response.has_header('Idempotent-Replayed') for response in responses), 3)
+        self.assertEqual(Company.objects.count(), 1)
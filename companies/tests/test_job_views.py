@@ -0,0 +1,148 @@
+import json
+from datetime import timedelta
+from rest_framework import status
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from companies import jobs
+from companies.models import Company, Job
+from companies.tests.factories import CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+
+
+client = Client()
+
+
+@jobs.register('test_count')
+def count_job(job):
+    for done in range(1, job.params['count'] + 1):
+        job.set_progress(done, job.params['count'])
+    return {'counted': job.params['count']}
+
+
+@jobs.register('test_fail')
+def fail_job(job):
+    raise RuntimeError('boom')
+
+
+class SubmitJobTest(TokenAuthMixin, TestCase):
+    """ Test module for submitting and polling jobs """
+
+    def submit(self, payload):
+        return client.post(
+            reverse('job_list'),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+
+    def test_submit_and_poll_job(self):
+        response = self.submit({'kind': 'test_count', 'params': {'count': 3}})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.PENDING)
+        self.assertEqual(Job.objects.get().created_by, self.user)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        response = client.get(
+            reverse('job_detail', kwargs={'pk': response.data['id']}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], Job.DONE)
+        self.assertEqual(response.data['progress'], 3)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['result'], {'counted': 3})
+        self.assertIsNotNone(response.data['finished_at'])
+
+    def test_submit_unknown_kind(self):
+        response = self.submit({'kind': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_status_is_read_only(self):
+        self.submit({'kind': 'test_count', 'params': {'count': 1}, 'status': Job.DONE})
+        self.assertEqual(Job.objects.get().status, Job.PENDING)
+
+    def test_jobs_of_other_users_are_hidden(self):
+        other = User.objects.create_user('other_user', 'other@test.com', 'test123')
+        job = jobs.submit('test_count', {'count': 1}, other)
+        response = client.get(
+            reverse('job_detail', kwargs={'pk': job.pk}),
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.submit({'kind': 'test_count', 'params': {'count': 1}})
+        response = client.get(reverse('job_list'), HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual([item['created_by'] for item in response.data], [self.user.pk])
+
+    def test_failed_job_records_error(self):
+        self.submit({'kind': 'test_fail'})
+        jobs.run_pending()
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('boom', job.error)
+
+
+class ClaimJobTest(TestCase):
+    """ Test module for claiming queued jobs """
+
+    def test_claims_oldest_pending_job(self):
+        first = jobs.submit('test_count', {'count': 1})
+        jobs.submit('test_count', {'count': 1})
+        claimed = jobs.claim_job()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.RUNNING)
+        self.assertNotEqual(jobs.claim_job().pk, first.pk)
+        self.assertIsNone(jobs.claim_job())
+
+    def test_delete_company_job(self):
+        company = CompanyFactory()
+        jobs.submit('delete_company', {'company': company.pk})
+        jobs.run_pending()
+        self.assertFalse(Company.objects.exists())
+        self.assertEqual(Job.objects.get().result, {'deleted_bank_accounts': 0})
+
+
+@override_settings(JOB_LEASE_SECONDS=60, JOB_MAX_ATTEMPTS=2)
+class JobLeaseTest(TestCase):
+    """ Test module for reclaiming jobs whose worker died """
+
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=61))
+
+    def test_running_job_is_not_claimed_again(self):
+        job = jobs.submit('test_count', {'count': 1})
+        jobs.claim_job()
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=59))
+        self.assertIsNone(jobs.claim_job())
+
+    def test_expired_job_is_claimed_again(self):
+        job = jobs.submit('test_count', {'count': 2})
+        stale = jobs.claim_job()
+        self.expire(job)
+        claimed = jobs.claim_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+        jobs.run_job(claimed)
+        with self.assertLogs('companies.jobs', 'WARNING'):
+            jobs.run_job(stale)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_progress_renews_the_lease(self):
+        job = jobs.submit('test_count', {'count': 1})
+        claimed = jobs.claim_job()
+        self.expire(job)
+        claimed.set_progress(1)
+        self.assertIsNone(jobs.claim_job())
+
+    def test_job_fails_after_max_attempts(self):
+        job = jobs.submit('test_count', {'count': 1})
+        pending = jobs.submit('test_count', {'count': 1})
+        for _ in range(2):
+            jobs.claim_job()
+            self.expire(job)
+        self.assertEqual(jobs.claim_job().pk, pending.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('2 attempts', job.error)
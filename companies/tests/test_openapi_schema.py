@@ -0,0 +1,67 @@
+import gzip
+from rest_framework import status
+from django.conf import settings
+from django.test import TestCase, Client
+from django.urls import reverse
+from companies.tests.mixins import TokenAuthMixin
+from CompaniesAPI.schema import generate_schema
+
+
+client = Client()
+
+
+class OpenAPISchemaTest(TokenAuthMixin, TestCase):
+    """ Test module for the precomputed OpenAPI schema """
+
+    def get(self, **headers):
+        return client.get(reverse('openapi-schema'), HTTP_AUTHORIZATION=f'Token {self.token.key}', **headers)
+
+    def test_schema_file_matches_views(self):
+        with open(settings.OPENAPI_SCHEMA_FILE, 'rb') as schema_file:
+            self.assertEqual(
+                schema_file.read(), generate_schema(),
+                'The OpenAPI schema is out of date, run `python manage.py generate_openapi_schema`.'
+            )
+
+    def test_get_schema(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, generate_schema())
+        self.assertIn('ETag', response)
+
+    def test_get_schema_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_weak_and_listed_etags_match(self):
+        etag = self.get()['ETag']
+        for if_none_match in (f'W/{etag}', f'"other", {etag}', '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.get(HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_each_encoding_has_its_own_etag(self):
+        etag = self.get()['ETag']
+        gzip_etag = self.get(HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertNotEqual(gzip_etag, etag)
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzip_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_compressed_schema(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), generate_schema())
+
+    def test_gzip_refused_with_zero_quality(self):
+        for accept_encoding in ('gzip;q=0', 'identity', 'gzip;q=0, identity'):
+            response = self.get(HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(response.content, generate_schema())
+
+    def test_schema_requires_authentication(self):
+        response = client.get(reverse('openapi-schema'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
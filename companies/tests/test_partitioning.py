@@ -0,0 +1,89 @@
+import re
+from unittest import skipUnless
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase
+from companies import partitioning
+from companies.models import BankAccount
+from companies.tests.factories import BankAccountFactory, BankFactory, CompanyFactory
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning requires PostgreSQL.')
+class PartitionBankAccountsTest(TestCase):
+    """ Test module for the online partitioning of the bank account table """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bank = BankFactory()
+        cls.companies = CompanyFactory.create_batch(4)
+        for company in cls.companies:
+            BankAccountFactory.create_batch(5, bank=cls.bank, company=company)
+
+    def rows(self):
+        return sorted(BankAccount.objects.values_list('id', 'bank_id', 'company_id', 'account_number', 'agency'))
+
+    def test_partition_bank_accounts(self):
+        rows = self.rows()
+        self.assertTrue(partitioning.partition_bank_accounts(connection, 4, batch_size=3))
+        self.assertTrue(partitioning.is_partitioned(connection))
+        self.assertEqual(partitioning.partition_count(connection), 4)
+        self.assertEqual(self.rows(), rows)
+        self.assertFalse(partitioning.partition_bank_accounts(connection, 4))
+
+    def test_writes_during_backfill_are_copied(self):
+        first, second, third = self.companies[:3]
+        partitioning.prepare(connection, 4)
+        created = BankAccountFactory(bank=self.bank, company=first)
+        BankAccount.objects.filter(company=second).update(agency='moved')
+        BankAccount.objects.filter(company=third).delete()
+        partitioning.backfill(connection, batch_size=7)
+        rows = self.rows()
+        partitioning.swap(connection)
+
+        self.assertEqual(self.rows(), rows)
+        self.assertTrue(BankAccount.objects.filter(pk=created.pk).exists())
+        self.assertFalse(BankAccount.objects.filter(company=third).exists())
+        self.assertEqual(set(BankAccount.objects.filter(company=second).values_list('agency', flat=True)), {'moved'})
+
+    def test_ids_continue_after_swap(self):
+        last_id = BankAccount.objects.order_by('id').last().pk
+        BankAccount.objects.filter(pk=last_id).delete()
+        partitioning.partition_bank_accounts(connection, 4)
+        self.assertGreater(BankAccountFactory(bank=self.bank, company=self.companies[0]).pk, last_id)
+
+    def test_company_queries_read_one_partition(self):
+        partitioning.partition_bank_accounts(connection, 4)
+        plan = BankAccount.objects.filter(company=self.companies[0]).explain()
+        self.assertEqual(len(set(re.findall(rf'{partitioning.TABLE}_p\d+', plan))), 1, plan)
+
+    def test_stopped_conversion_is_resumed(self):
+        rows = self.rows()
+        partitioning.prepare(connection, 4)
+        partitioning.backfill(connection, batch_size=7)
+        # e.g. the swap timed out waiting for its lock
+        created = BankAccountFactory(bank=self.bank, company=self.companies[0])
+        self.assertTrue(partitioning.is_prepared(connection))
+        self.assertTrue(partitioning.partition_bank_accounts(connection, 8))
+        self.assertEqual(partitioning.partition_count(connection), 4)
+        self.assertEqual(self.rows(), sorted(rows + [
+            (created.pk, self.bank.pk, created.company_id, created.account_number, created.agency)
+        ]))
+
+    def test_abort(self):
+        partitioning.prepare(connection, 4)
+        partitioning.abort(connection)
+        self.assertFalse(partitioning.is_prepared(connection))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT to_regclass(%s), to_regclass(%s)",
+                [f'{partitioning.TABLE}_partitioned', f'{partitioning.TABLE}_partitioned_id_seq'],
+            )
+            self.assertEqual(cursor.fetchone(), (None, None))
+        BankAccountFactory(bank=self.bank, company=self.companies[0])
+        self.assertTrue(partitioning.partition_bank_accounts(connection, 4))
+
+    def test_historical_model(self):
+        apps = MigrationLoader(connection).project_state(('companies', '0010_partition_bank_account')).apps
+        model = apps.get_model('companies', 'BankAccount')
+        self.assertTrue(partitioning.partition_bank_accounts(connection, 4, model=model))
+        self.assertTrue(partitioning.is_partitioned(connection))
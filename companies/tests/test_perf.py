@@ -0,0 +1,170 @@
+import json
+import os
+import time
+from decimal import Decimal
+from rest_framework import status
+from django.db import connection
+from django.test import TestCase, Client, tag
+from django.urls import reverse
+from companies.models import Bank, Company, BankAccount, Change, Job
+from companies.tests.mixins import TokenAuthMixin
+
+
+client = Client()
+
+# Multiplies the dataset size, e.g. PERF_SCALE=10 for a tenfold dataset.
+SCALE = float(os.environ.get('PERF_SCALE', 1))
+# Multiplies the latency budgets, for slower machines.
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE', 1))
+
+BANKS = 200
+COMPANIES = int(5000 * SCALE)
+ACCOUNTS_PER_COMPANY = 4
+CHANGES = int(20000 * SCALE)
+# token, feed horizon (PostgreSQL only), changes
+CHANGE_FEED_QUERIES = 3 if connection.vendor == 'postgresql' else 2
+
+
+@tag('perf')
+class EndpointBudgetTest(TokenAuthMixin, TestCase):
+    """ Query count and latency budgets of every endpoint on a large dataset """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        banks = Bank.objects.bulk_create(Bank(code=f'{index:03d}', name=f'Bank {index}') for index in range(BANKS))
+        companies = Company.objects.bulk_create(
+            Company(
+                name=f'Company {index}', phone=f'+55489{index:08d}', phone_e164=f'+55489{index:08d}',
+                address='Street', city='City', state='State', country='Brazil', earnings_declared=Decimal(index),
+            )
+            for index in range(COMPANIES)
+        )
+        BankAccount.objects.bulk_create(
+            (
+                BankAccount(
+                    bank=banks[(index + offset) % BANKS], company=company,
+                    account_number=f'{index:06d}{offset:04d}', agency='0001',
+                )
+                for index, company in enumerate(companies)
+                for offset in range(ACCOUNTS_PER_COMPANY)
+            ),
+            batch_size=5000,
+        )
+        Job.objects.bulk_create(
+            Job(kind='delete_company', params={'company': index}, created_by=cls.user) for index in range(1000)
+        )
+        Change.objects.bulk_create(
+            (
+                Change(
+                    model='company', object_id=companies[index % COMPANIES].pk, action=Change.UPDATED,
+                    data={'name': companies[index % COMPANIES].name},
+                )
+                for index in range(CHANGES)
+            ),
+            batch_size=5000,
+        )
+        cls.company_ids = [company.pk for company in companies]
+        cls.company = companies[COMPANIES // 2]
+        cls.bank = banks[BANKS // 2]
+        cls.bank_account = BankAccount.objects.filter(company=cls.company).first()
+        cls.job = Job.objects.first()
+        cls.change = Change.objects.order_by('xid', 'id')[CHANGES // 2]
+
+    def assertWithinBudget(self, url, queries, seconds, method='get', expected_status=status.HTTP_200_OK, **extra):
+        with self.assertNumQueries(queries):
+            start = time.perf_counter()
+            response = getattr(client, method)(url, HTTP_AUTHORIZATION=f'Token {self.token.key}', **extra)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(response.status_code, expected_status)
+        self.assertLess(elapsed, seconds * BUDGET_SCALE, f'{url} took {elapsed:.3f}s')
+        return response
+
+    def test_company_list(self):
+        # token, companies, bank accounts
+        response = self.assertWithinBudget(reverse('company_list'), 3, 3.0 * SCALE)
+        self.assertEqual(len(response.data), COMPANIES)
+
+    def test_company_phone_lookup(self):
+        self.assertWithinBudget(reverse('company_list') + '?phone=48900001000', 3, 0.1)
+
+    def test_company_ids(self):
+        ids = ','.join(str(pk) for pk in self.company_ids[:1000])
+        response = self.assertWithinBudget(reverse('company_list') + f'?ids={ids}', 3, 0.5)
+        self.assertEqual(len(response.data['results']), 1000)
+
+    def test_company_batch(self):
+        response = self.assertWithinBudget(
+            reverse('company_batch'), 3, 3.0 * SCALE, method='post',
+            data=json.dumps({'ids': self.company_ids}), content_type='application/json',
+        )
+        self.assertEqual(len(response.data['results']), COMPANIES)
+
+    def test_company_detail(self):
+        self.assertWithinBudget(reverse('company_detail', kwargs={'pk': self.company.pk}), 3, 0.1)
+
+    def test_bank_list(self):
+        self.assertWithinBudget(reverse('bank_list'), 2, 0.2)
+
+    def test_bank_batch(self):
+        ids = list(Bank.objects.values_list('pk', flat=True))
+        self.assertWithinBudget(
+            reverse('bank_batch'), 2, 0.2, method='post',
+            data=json.dumps({'ids': ids}), content_type='application/json',
+        )
+
+    def test_bank_detail(self):
+        self.assertWithinBudget(reverse('bank_detail', kwargs={'pk': self.bank.pk}), 2, 0.1)
+
+    def test_bank_account_list(self):
+        self.assertWithinBudget(reverse('bank_accounts_list'), 2, 2.0 * SCALE)
+
+    def test_bank_account_ids(self):
+        ids = ','.join(str(pk) for pk in BankAccount.objects.values_list('pk', flat=True)[:1000])
+        response = self.assertWithinBudget(reverse('bank_accounts_list') + f'?ids={ids}', 2, 0.5)
+        self.assertEqual(len(response.data['results']), 1000)
+
+    def test_bank_account_batch(self):
+        ids = list(BankAccount.objects.values_list('pk', flat=True)[:5000])
+        self.assertWithinBudget(
+            reverse('bank_accounts_batch'), 2, 1.0, method='post',
+            data=json.dumps({'ids': ids}), content_type='application/json',
+        )
+
+    def test_bank_account_detail(self):
+        self.assertWithinBudget(reverse('bank_accounts_detail', kwargs={'pk': self.bank_account.pk}), 2, 0.1)
+
+    def test_job_list(self):
+        self.assertWithinBudget(reverse('job_list'), 2, 0.5)
+
+    def test_job_detail(self):
+        self.assertWithinBudget(reverse('job_detail', kwargs={'pk': self.job.pk}), 2, 0.1)
+
+    def test_change_feed(self):
+        response = self.assertWithinBudget(reverse('change_list'), CHANGE_FEED_QUERIES, 0.3)
+        self.assertEqual(len(response.data['results']), 1000)
+
+    def test_change_feed_from_cursor(self):
+        cursor = f'{self.change.xid}.{self.change.pk}'
+        response = self.assertWithinBudget(
+            reverse('change_list') + f'?since={cursor}&limit=10000', CHANGE_FEED_QUERIES, 2.0
+        )
+        self.assertEqual(len(response.data['results']), min(CHANGES - CHANGES // 2 - 1, 10000))
+
+    def test_keyed_company_create(self):
+        payload = json.dumps({
+            'name': 'Keyed', 'phone': '+5548999990000', 'address': 'Street', 'city': 'City',
+            'state': 'State', 'country': 'Brazil', 'earnings_declared': '1.00',
+        })
+        for queries in (9, 5):
+            # The create, then its replay.
+            self.assertWithinBudget(
+                reverse('company_list'), queries, 0.1, method='post', expected_status=status.HTTP_201_CREATED,
+                data=payload, content_type='application/json', HTTP_IDEMPOTENCY_KEY='create',
+            )
+
+    def test_keyed_company_update(self):
+        self.assertWithinBudget(
+            reverse('company_detail', kwargs={'pk': self.company.pk}), 12, 0.1, method='patch',
+            data=json.dumps({'name': 'Keyed'}), content_type='application/json', HTTP_IDEMPOTENCY_KEY='update',
+        )
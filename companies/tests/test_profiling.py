@@ -0,0 +1,148 @@
+import json
+import pstats
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from companies.tests.factories import CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+from companies.views import CompanyList
+from CompaniesAPI import profiling
+from CompaniesAPI.profiling import StackSampler, list_profiles, make_token
+
+
+client = Client()
+
+
+class ProfilingTest(TokenAuthMixin, TestCase):
+    """ Test module for the request profiling middleware """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        CompanyFactory.create_batch(3)
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILE_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get_companies(self, **headers):
+        return client.get(
+            reverse('company_list'), {'ordering': 'name'}, HTTP_AUTHORIZATION=f'Token {self.token.key}', **headers
+        )
+
+    def test_nothing_is_profiled_by_default(self):
+        self.get_companies(HTTP_X_PROFILE_TOKEN=make_token())
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        response = self.get_companies()
+        self.assertEqual(response.status_code, 200)
+        profile, = list_profiles()
+        self.assertEqual(profile['kind'], 'cprofile')
+        self.assertEqual(profile['reason'], 'sample')
+        self.assertEqual(profile['view'], 'company_list')
+        self.assertEqual(profile['query_string'], 'ordering=name')
+        self.assertEqual(profile['status'], 200)
+        functions = {function for _, _, function in pstats.Stats(profile['file']).stats}
+        self.assertIn('list', functions)
+
+    @override_settings(PROFILE_TOKEN_MAX_AGE=60)
+    def test_signed_header(self):
+        self.get_companies(HTTP_X_PROFILE_TOKEN='profile:forged:signature')
+        self.assertEqual(list_profiles(), [])
+        self.get_companies(HTTP_X_PROFILE_TOKEN=make_token())
+        profile, = list_profiles()
+        self.assertEqual(profile['reason'], 'token')
+
+    @override_settings(PROFILE_SLOW_SECONDS=10, PROFILE_SAMPLE_INTERVAL=0.001)
+    def test_fast_request_is_not_sampled(self):
+        self.get_companies()
+        self.assertEqual(list_profiles(), [])
+
+    @override_settings(PROFILE_SLOW_SECONDS=0.05, PROFILE_SAMPLE_INTERVAL=0.001)
+    def test_slow_request_stacks_are_sampled(self):
+        original = CompanyList.list
+
+        def slow_list(view, request, *args, **kwargs):
+            time.sleep(0.2)
+            return original(view, request, *args, **kwargs)
+
+        with mock.patch.object(CompanyList, 'list', slow_list):
+            self.get_companies()
+        profile, = list_profiles()
+        self.assertEqual(profile['kind'], 'collapsed')
+        self.assertEqual(profile['reason'], 'slow')
+        self.assertGreaterEqual(profile['duration'], 0.2)
+        stacks = Path(profile['file']).read_text()
+        self.assertIn('slow_list (test_profiling.py', stacks)
+
+    @override_settings(PROFILE_SLOW_SECONDS=10, PROFILE_SAMPLE_INTERVAL=0.001)
+    def test_sampler_waits_until_a_request_gets_slow(self):
+        sampler = StackSampler()
+        with mock.patch.object(profiling, 'time', wraps=time) as timer:
+            sampler._ensure_thread()
+            time.sleep(0.05)
+            with sampler.watch():
+                time.sleep(0.05)
+        timer.sleep.assert_not_called()
+
+    def test_sampler_thread_is_started_once(self):
+        sampler = StackSampler()
+        barrier = threading.Barrier(8)
+
+        def first_request():
+            barrier.wait()
+            sampler._ensure_thread()
+
+        requests = [threading.Thread(target=first_request) for _ in range(8)]
+        with mock.patch.object(profiling, 'threading') as sampler_threading:
+            for request in requests:
+                request.start()
+            for request in requests:
+                request.join()
+        sampler_threading.Thread.assert_called_once()
+
+    @override_settings(PROFILE_SAMPLE_RATE=1, PROFILE_KEEP=2)
+    def test_oldest_profiles_are_removed(self):
+        for _ in range(3):
+            self.get_companies()
+        self.assertEqual(len(list_profiles()), 2)
+        self.assertEqual(len(list(self.directory.iterdir())), 4)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_list_profiles_command(self):
+        self.get_companies()
+        profile, = list_profiles()
+        output = StringIO()
+        call_command('list_profiles', stdout=output)
+        self.assertIn(f"{profile['name']}  sample", output.getvalue())
+        self.assertIn('1 profiles', output.getvalue())
+
+        output = StringIO()
+        call_command('list_profiles', show=profile['name'], limit=5, stdout=output)
+        self.assertIn('view: company_list', output.getvalue())
+        self.assertIn('cumulative', output.getvalue())
+
+    def test_list_profiles_command_summarizes_stacks(self):
+        name = '20260101T000000.000000-1-GET-api-v1-companies'
+        (self.directory / f'{name}.collapsed').write_text('main (a.py:1);view (b.py:1) 3\nmain (a.py:1) 1\n')
+        (self.directory / f'{name}.json').write_text(json.dumps({
+            'kind': 'collapsed', 'reason': 'slow', 'method': 'GET', 'path': '/api/v1/companies/',
+            'query_string': '', 'view': 'company_list', 'status': 200, 'duration': 2.5,
+        }))
+        output = StringIO()
+        call_command('list_profiles', show=name, stdout=output)
+        self.assertIn(' 75.0%  view (b.py:1)', output.getvalue())
+        self.assertIn('100.0%  main (a.py:1)', output.getvalue())
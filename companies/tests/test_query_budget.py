@@ -0,0 +1,93 @@
+import json
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from companies.models import Company
+from companies.serializers import CompanySerializer
+from companies.tests.factories import BankAccountFactory
+from companies.tests.mixins import TokenAuthMixin
+from companies.views import CompanyList
+from CompaniesAPI.querybudget import QueryBudgetExceeded, assert_query_budget, fingerprint
+
+
+client = Client()
+
+
+class FingerprintTest(TestCase):
+    """ Test module for SQL fingerprints """
+
+    def test_literals_and_parameters_are_replaced(self):
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a"  WHERE "a"."id" = %s AND "a"."name" = \'x\' LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."id" = ? AND "a"."name" = ? LIMIT ?',
+        )
+
+    def test_in_lists_of_any_length_match(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM "a" WHERE "a"."id" IN (%s, %s, %s)'),
+            fingerprint('SELECT 1 FROM "a" WHERE "a"."id" IN (%s)'),
+        )
+
+    def test_identifiers_are_kept(self):
+        self.assertIn('"companies_bankaccount_p1"', fingerprint('SELECT * FROM "companies_bankaccount_p1"'))
+
+
+class QueryBudgetTest(TokenAuthMixin, TestCase):
+    """ Test module for query budgets and N+1 detection """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        BankAccountFactory.create_batch(5)
+
+    def get_companies(self):
+        return client.get(reverse('company_list'), HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_n_plus_one_names_the_serializer_field(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with assert_query_budget():
+                CompanySerializer(Company.objects.all(), many=True).data
+        violation, = json.loads(str(raised.exception))
+        self.assertEqual(violation['type'], 'n_plus_one')
+        self.assertEqual(violation['count'], 5)
+        self.assertEqual(violation['origins'], ['CompanySerializer.bank_accounts'])
+
+    def test_prefetched_serialization_passes(self):
+        with assert_query_budget(2):
+            CompanySerializer(Company.objects.prefetch_related('bank_accounts'), many=True).data
+
+    def test_budget(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with assert_query_budget(1):
+                list(Company.objects.all())
+                list(Company.objects.all())
+
+    def test_view_over_budget_fails(self):
+        with mock.patch.object(CompanyList, 'query_budget', {'GET': 2}):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                self.get_companies()
+        report = json.loads(str(raised.exception))
+        self.assertEqual(report['view'], 'CompanyList')
+        self.assertEqual(report['violations'], [{'type': 'budget', 'queries': 3, 'budget': 2}])
+
+    def test_view_with_n_plus_one_fails(self):
+        with mock.patch.object(CompanyList, 'queryset', Company.objects.all()):
+            with self.assertRaises(QueryBudgetExceeded) as raised:
+                self.get_companies()
+        violations = json.loads(str(raised.exception))['violations']
+        self.assertIn('CompanySerializer.bank_accounts', violations[-1]['origins'])
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_warn_mode_logs_json(self):
+        with mock.patch.object(CompanyList, 'query_budget', {'GET': 2}):
+            with self.assertLogs('CompaniesAPI.middleware', 'WARNING') as logs:
+                response = self.get_companies()
+        self.assertEqual(response.status_code, 200)
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report['event'], 'query_budget_exceeded')
+        self.assertEqual(report['path'], reverse('company_list'))
+
+    @override_settings(QUERY_BUDGET_MODE='off')
+    def test_off_mode(self):
+        with mock.patch.object(CompanyList, 'query_budget', {'GET': 0}):
+            self.assertEqual(self.get_companies().status_code, 200)
@@ -0,0 +1,98 @@
+from unittest import mock
+from rest_framework import status
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from companies.tests.factories import CompanyFactory
+from companies.tests.mixins import TokenAuthMixin
+from companies.throttling import TokenRateThrottle
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+
+
+client = Client()
+
+THROTTLE_SETTINGS = {
+    'DEFAULT_PERMISSION_CLASSES': [],
+    'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_THROTTLE_RATES': {
+        'list_burst': '3/min',
+        'list_sustained': '100/hour',
+        'detail_burst': '5/min',
+        'detail_sustained': '100/hour',
+    },
+}
+
+
+@override_settings(REST_FRAMEWORK=THROTTLE_SETTINGS)
+class ThrottlingTest(TokenAuthMixin, TestCase):
+    """ Test module for per token rate limiting """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.company_1 = CompanyFactory()
+        cls.other_user = User.objects.create_user('other_user', 'other@test.com', 'test123')
+        cls.other_token = Token.objects.create(user=cls.other_user)
+
+    def at(self, now):
+        # Freeze both the throttle clock and the cache expiry clock.
+        patcher = mock.patch('time.time', return_value=now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        timer = mock.patch.object(TokenRateThrottle, 'timer', staticmethod(lambda: now))
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def get(self, url, token):
+        return client.get(url, HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def test_list_burst_is_throttled_with_retry_after(self):
+        self.at(1000.0)
+        for _ in range(3):
+            response = self.get(reverse('company_list'), self.token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.get(reverse('company_list'), self.token)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_tokens_have_separate_budgets(self):
+        self.at(1000.0)
+        for _ in range(4):
+            self.get(reverse('company_list'), self.token)
+        response = self.get(reverse('company_list'), self.other_token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_budget_is_separate_from_list(self):
+        self.at(1000.0)
+        for _ in range(4):
+            self.get(reverse('company_list'), self.token)
+        response = self.get(reverse('company_detail', kwargs={'pk': self.company_1.pk}), self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_budget_slides_back_after_window(self):
+        self.at(1000.0)
+        for _ in range(4):
+            self.get(reverse('company_list'), self.token)
+        self.at(1000.0 + 120)
+        response = self.get(reverse('company_list'), self.token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK={
+        **THROTTLE_SETTINGS,
+        'DEFAULT_THROTTLE_RATES': {'list_burst': '3/min', 'list_sustained': '5/hour'},
+    })
+    def test_burst_rejections_do_not_consume_sustained_budget(self):
+        self.at(1000.0)
+        for _ in range(3):
+            self.get(reverse('company_list'), self.token)
+        for _ in range(3):
+            response = self.get(reverse('company_list'), self.token)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # The burst window has passed, 2 of the 5 sustained requests are left.
+        self.at(1000.0 + 120)
+        for _ in range(2):
+            response = self.get(reverse('company_list'), self.token)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.get(reverse('company_list'), self.token)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
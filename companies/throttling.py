@@ -0,0 +1,123 @@
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework.settings import api_settings
+
+
+class SlidingWindow:
+    """
+    Counter of one rate (e.g. `list_burst`) for the current request.
+
+    Each client holds two integer counters in the cache, the current and
+    previous fixed windows. The previous window is weighted by how much of it
+    still overlaps the sliding window, so every check is O(1) in time and
+    space.
+    """
+
+    def __init__(self, cache, key, num_requests, duration, now):
+        self.cache = cache
+        self.num_requests = num_requests
+        self.duration = duration
+        window = int(now // duration)
+        self.current_key = f'{key}_{window}'
+        self.elapsed = now - window * duration
+
+        # Counters outlive their window by one period so they can be used
+        # as the "previous" window.
+        cache.add(self.current_key, 0, duration * 2)
+        try:
+            self.current = cache.incr(self.current_key)
+        except ValueError:
+            # The key expired between add and incr.
+            cache.set(self.current_key, 1, duration * 2)
+            self.current = 1
+        self.previous = cache.get(f'{key}_{window - 1}', 0)
+
+    def exceeded(self):
+        overlap = (self.duration - self.elapsed) / self.duration
+        return self.previous * overlap + self.current > self.num_requests
+
+    def undo(self):
+        self.cache.decr(self.current_key)
+        self.current -= 1
+
+    def wait(self):
+        """
+        Seconds until the weighted count drops below the limit.
+        """
+        remaining = self.duration - self.elapsed
+        if self.previous:
+            # Time for enough of the previous window to slide out.
+            excess = self.previous * remaining / self.duration + self.current + 1 - self.num_requests
+            wait = excess * self.duration / self.previous
+            if wait <= remaining:
+                return max(wait, 0)
+        if self.current < self.num_requests:
+            return remaining
+        # After the rollover the current window becomes the previous one.
+        return remaining + self.duration * (1 - (self.num_requests - 1) / self.current)
+
+
+class TokenRateThrottle(SimpleRateThrottle):
+    """
+    Sliding window counter throttle keyed by the auth token.
+
+    Instead of keeping the full request history like SimpleRateThrottle, each
+    rate is a `SlidingWindow`. Counters are updated with the cache's atomic
+    `incr`, which keeps the limit correct across workers when a shared cache
+    (Redis) is configured.
+
+    The rates are looked up from `<view.throttle_scope>_<rate suffix>`, e.g.
+    `list_burst` and `list_sustained`. They are checked by one throttle
+    because DRF runs every throttle class even after one rejected the
+    request, and a request rejected by any rate must not count against the
+    others.
+    """
+    rate_suffixes = ('burst', 'sustained')
+
+    def __init__(self):
+        # The rates depend on the view's scope, so they are resolved in allow_request.
+        pass
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            return None
+
+    def get_cache_key(self, request, view):
+        if request.auth is not None:
+            ident = request.auth.pk
+        else:
+            ident = self.get_ident(request)
+
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': ident
+        }
+
+    def allow_request(self, request, view):
+        view_scope = getattr(view, 'throttle_scope', None)
+        if not view_scope:
+            return True
+
+        now = self.timer()
+        windows = []
+        for suffix in self.rate_suffixes:
+            self.scope = f'{view_scope}_{suffix}'
+            rate = self.get_rate()
+            if rate is None:
+                continue
+            key = self.get_cache_key(request, view)
+            if key is None:
+                continue
+            windows.append(SlidingWindow(self.cache, key, *self.parse_rate(rate), now))
+
+        self.rejected_by = [window for window in windows if window.exceeded()]
+        if self.rejected_by:
+            # Rejected requests do not consume the budget of any rate.
+            for window in windows:
+                window.undo()
+            return False
+        return True
+
+    def wait(self):
+        return max(window.wait() for window in self.rejected_by)
@@ -1,11 +1,18 @@
 from django.urls import path
-from .views import CompanyList, CompanyDetail, BankList, BankDetail, BankAccountList, BankAccountDetail
+from .views import CompanyList, CompanyDetail, BankList, BankDetail, BankAccountList, BankAccountDetail, \
+    CompanyBatch, BankBatch, BankAccountBatch, JobList, JobDetail, ChangeList
 
 urlpatterns = [
     path("companies/", CompanyList.as_view(), name="company_list"),
+    path("companies/batch/", CompanyBatch.as_view(), name="company_batch"),
     path("companies/<int:pk>/", CompanyDetail.as_view(), name="company_detail"),
     path("banks/", BankList.as_view(), name="bank_list"),
+    path("banks/batch/", BankBatch.as_view(), name="bank_batch"),
     path("banks/<int:pk>/", BankDetail.as_view(), name="bank_detail"),
     path("bank_accounts/", BankAccountList.as_view(), name="bank_accounts_list"),
+    path("bank_accounts/batch/", BankAccountBatch.as_view(), name="bank_accounts_batch"),
     path("bank_accounts/<int:pk>/", BankAccountDetail.as_view(), name="bank_accounts_detail"),
+    path("jobs/", JobList.as_view(), name="job_list"),
+    path("jobs/<int:pk>/", JobDetail.as_view(), name="job_detail"),
+    path("changes/", ChangeList.as_view(), name="change_list"),
 ]
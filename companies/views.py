@@ -1,50 +1,386 @@
-from rest_framework import generics
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.response import Response
+from rest_framework.schemas.openapi import AutoSchema
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from .models import Company, Bank, BankAccount
-from .serializers import CompanySerializer, BankSerializer, BankAccountSerializer
+from rest_framework.settings import api_settings
+from CompaniesAPI.querybudget import allow_queries
+from . import idempotency
+from .changes import feed_horizon, record
+from .models import Company, Bank, BankAccount, Change, Job
+from .serializers import CompanySerializer, BankSerializer, BankAccountSerializer, JobSerializer, ChangeSerializer, \
+    BatchIdsSerializer
+from .deletion import start_company_deletion
+from .phones import to_e164
+from .renderers import list_renderer_classes
+from .throttling import TokenRateThrottle
 
 
-class CompanyList(generics.ListCreateAPIView):
-    queryset = Company.objects.all()
+class AtomicUpdateMixin:
+    """
+    Run updates in a single transaction, locking the row being updated.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method in ('PUT', 'PATCH'):
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+
+class IdempotentSchema(AutoSchema):
+    def get_operation(self, path, method):
+        operation = super().get_operation(path, method)
+        if method in ('POST', 'PUT', 'PATCH'):
+            operation['parameters'].append({
+                'name': idempotency.HEADER,
+                'in': 'header',
+                'required': False,
+                'description': 'Retries with the same key get the first response instead of writing again.',
+                'schema': {'type': 'string', 'maxLength': 255},
+            })
+        return operation
+
+
+class IdempotentWriteMixin:
+    """
+    Creates and updates sent with an `Idempotency-Key` header are made
+    once, retries with the key get the stored response (with an
+    `Idempotent-Replayed` header) for IDEMPOTENCY_KEY_TTL seconds, see
+    `idempotency`. Reusing a key for a different request is a 422.
+    """
+    schema = IdempotentSchema()
+
+    def create(self, request, *args, **kwargs):
+        return self.idempotent(super().create, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.idempotent(super().update, request, *args, **kwargs)
+
+    def idempotent(self, write, request, *args, **kwargs):
+        key = request.headers.get(idempotency.HEADER)
+        if key is None:
+            return write(request, *args, **kwargs)
+        # Claiming, and storing the response of, the key.
+        allow_queries(request, 3)
+        with transaction.atomic():
+            stored = idempotency.claim(request, key)
+            if stored.status_code is not None:
+                return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
+            response = write(request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                idempotency.store(stored, response)
+            else:
+                transaction.set_rollback(True)
+            return response
+
+
+class BatchRetrieveMixin:
+    """
+    `?ids=1,2,3` on a list returns those objects in the order requested and
+    the ids that don't exist, fetched with a single `id = ANY(...)` query.
+    Batch views take the ids in a POST body for sets too large for a URL.
+    """
+
+    def list(self, request, *args, **kwargs):
+        ids = request.query_params.get('ids')
+        if ids is None:
+            return super().list(request, *args, **kwargs)
+        return self.batch([value.strip() for value in ids.split(',')])
+
+    def batch(self, ids):
+        serializer = BatchIdsSerializer(data={'ids': ids})
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        found = {obj.pk: obj for obj in self.filter_queryset(self.get_queryset()).filter(pk__any=ids)}
+        return Response({
+            'results': self.get_serializer([found[pk] for pk in ids if pk in found], many=True).data,
+            'missing': [pk for pk in ids if pk not in found],
+        })
+
+
+class BatchSchema(AutoSchema):
+    def get_operation_id(self, path, method):
+        return 'batchGet' + self.get_operation_id_base(path, method, 'list')
+
+    def get_request_serializer(self, path, method):
+        return BatchIdsSerializer()
+
+    def get_responses(self, path, method):
+        # Answered like a GET of the list.
+        return super().get_responses(path, 'GET')
+
+
+class BatchRetrieveView(BatchRetrieveMixin, generics.GenericAPIView):
+    schema = BatchSchema()
+    parser_classes = (JSONParser,)
+    # Reads only, so it may use a replica and doesn't pin the client to the primary.
+    read_only_methods = ('POST',)
+
+    def post(self, request, *args, **kwargs):
+        return self.batch(request.data.get('ids') if isinstance(request.data, dict) else None)
+
+
+class CompanyList(IdempotentWriteMixin, BatchRetrieveMixin, generics.ListCreateAPIView):
+    queryset = Company.objects.prefetch_related('bank_accounts')
     serializer_class = CompanySerializer
     paginate_by = 30
+    renderer_classes = list_renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES)
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    query_budget = {'GET': 3, 'POST': 4}
+
+    def get_queryset(self):
+        """
+        `?phone=` accepts a phone number in any format and matches it
+        through the indexed E.164 column.
+        """
+        queryset = super().get_queryset()
+        phone = self.request.query_params.get('phone')
+        if phone is not None:
+            phone_e164 = to_e164(phone)
+            if not phone_e164:
+                raise ValidationError({'phone': ['Enter a valid phone number.']})
+            queryset = queryset.filter(phone_e164=phone_e164)
+        return queryset
+
+
+class CompanyBatch(BatchRetrieveView):
+    queryset = Company.objects.prefetch_related('bank_accounts')
+    serializer_class = CompanySerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    query_budget = {'POST': 3}
 
 
-class CompanyDetail(generics.RetrieveUpdateDestroyAPIView):
+class CompanyDetail(IdempotentWriteMixin, AtomicUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'detail'
+    read_from_replica = True
+    query_budget = {'GET': 3, 'PUT': 5, 'PATCH': 5, 'DELETE': 6}
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        `?async=true` queues the deletion of the company and its bank
+        accounts as a background job and returns 202 with the job.
+        """
+        if request.query_params.get('async') != 'true':
+            return super().destroy(request, *args, **kwargs)
+        job = start_company_deletion(self.get_object(), request.user)
+        return Response(
+            JobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('job_detail', kwargs={'pk': job.pk})},
+        )
 
 
-class BankList(generics.ListCreateAPIView):
+class BankList(IdempotentWriteMixin, BatchRetrieveMixin, generics.ListCreateAPIView):
     queryset = Bank.objects.all()
     serializer_class = BankSerializer
     paginate_by = 30
+    renderer_classes = list_renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES)
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    query_budget = {'GET': 2, 'POST': 3}
+
+
+class BankBatch(BatchRetrieveView):
+    queryset = Bank.objects.all()
+    serializer_class = BankSerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    query_budget = {'POST': 2}
 
 
-class BankDetail(generics.RetrieveUpdateDestroyAPIView):
+class BankDetail(IdempotentWriteMixin, AtomicUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Bank.objects.all()
     serializer_class = BankSerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'detail'
+    read_from_replica = True
+    query_budget = {'GET': 2, 'PUT': 4, 'PATCH': 4, 'DELETE': 6}
 
 
-class BankAccountList(generics.ListCreateAPIView):
+class BankAccountList(IdempotentWriteMixin, BatchRetrieveMixin, generics.ListCreateAPIView):
     queryset = BankAccount.objects.all()
     serializer_class = BankAccountSerializer
     paginate_by = 30
+    renderer_classes = list_renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES)
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    # Loading the bank cache adds a query when it is cold.
+    query_budget = {'GET': 3, 'POST': 5}
+
+    def get_queryset(self):
+        """
+        `?company=` lists the accounts of one company, which only reads
+        its partition when the table is partitioned.
+        """
+        queryset = super().get_queryset()
+        company = self.request.query_params.get('company')
+        if company is not None:
+            if not company.isdigit():
+                raise ValidationError({'company': ['A valid integer is required.']})
+            queryset = queryset.filter(company_id=int(company))
+        return queryset
+
+
+class BankAccountBatch(BatchRetrieveView):
+    queryset = BankAccount.objects.all()
+    serializer_class = BankAccountSerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    read_from_replica = True
+    query_budget = {'POST': 3}
 
 
-class BankAccountDetail(generics.RetrieveUpdateDestroyAPIView):
+class BankAccountDetail(IdempotentWriteMixin, AtomicUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = BankAccount.objects.all()
     serializer_class = BankAccountSerializer
     authentication_classes = [TokenAuthentication, ]
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'detail'
+    read_from_replica = True
+    query_budget = {'GET': 3, 'PUT': 6, 'PATCH': 6, 'DELETE': 4}
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            record(instance, Change.DELETED)
+            instance.delete()
+
+
+class JobList(generics.ListCreateAPIView):
+    queryset = Job.objects.order_by('-created_at')
+    serializer_class = JobSerializer
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    query_budget = {'GET': 2, 'POST': 2}
+
+    def get_queryset(self):
+        # Params, results and errors are only shown to the job's creator.
+        return super().get_queryset().filter(created_by=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+
+class JobDetail(generics.RetrieveAPIView):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'detail'
+    query_budget = {'GET': 2}
+
+    def get_queryset(self):
+        return super().get_queryset().filter(created_by=self.request.user)
+
+
+class ChangeList(generics.ListAPIView):
+    """
+    Changes to companies, banks and bank accounts after the `since` cursor,
+    oldest first. Deletions have no data. Pass the returned `cursor` as
+    `since` to get the next changes.
+    """
+    queryset = Change.objects.order_by('xid', 'id')
+    serializer_class = ChangeSerializer
+    authentication_classes = [TokenAuthentication, ]
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (TokenRateThrottle,)
+    throttle_scope = 'list'
+    # Writers in progress are only known to the primary, see get_queryset.
+    query_budget = {'GET': 3}
+    default_limit = 1000
+    max_limit = 10000
+
+    def get_int_param(self, name, default, maximum=None):
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: ['A valid integer is required.']})
+        if value < 0:
+            raise ValidationError({name: ['Ensure this value is greater than or equal to 0.']})
+        return min(value, maximum) if maximum else value
+
+    def get_since(self):
+        """
+        The (xid, id) of the `since` cursor. A plain id, as returned before
+        changes had an xid, is an xid of 0.
+        """
+        since = self.request.query_params.get('since', '0')
+        xid, _, pk = since.rpartition('.')
+        if not pk.isdigit() or not (xid or '0').isdigit():
+            raise ValidationError({'since': ['A cursor returned by the change feed is required.']})
+        return int(xid or 0), int(pk)
+
+    def get_queryset(self):
+        """
+        On Postgres ids are handed out before commit, so a change may become
+        visible after a higher id. Changes are read in the order their
+        transactions wrote their first change instead, and only those below
+        every writer still in progress, which no later commit can precede,
+        see `changes.feed_horizon`. The reading transaction's own changes are
+        included too, which only happens in tests.
+        """
+        queryset = super().get_queryset()
+        horizon = feed_horizon(queryset.db)
+        if horizon is not None:
+            below, own = horizon
+            queryset = queryset.filter(Q(xid__lt=below) | Q(xid=own))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        xid, since = self.get_since()
+        limit = self.get_int_param('limit', self.default_limit, self.max_limit) or self.default_limit
+        changes = list(self.get_queryset().filter(Q(xid__gt=xid) | Q(xid=xid, id__gt=since))[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if changes:
+            xid, since = changes[-1].xid, changes[-1].id
+        return Response({
+            'results': self.get_serializer(changes, many=True).data,
+            'cursor': f'{xid}.{since}',
+            'has_more': has_more,
+        })
@@ -11,6 +11,10 @@ then
     echo "PostgreSQL started"
 fi
 
-python manage.py migrate
+# Only one process should migrate, so API and job workers skip it by default.
+if [ "$RUN_MIGRATIONS" = "1" ]
+then
+    python manage.py migrate
+fi
 
 exec "$@"